@@ -1,11 +1,28 @@
-from typing import Any, Dict, List, Optional
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple
 
 import anthropic
+from ai_generator_cache import LLMCache, SemanticCache
+
+# Conversation history is formatted as "User: ..." / "Assistant: ..." lines
+_TURN_BOUNDARY = re.compile(r"\n(?=(?:User|Assistant): )")
+
+
+@lru_cache(maxsize=8)
+def _get_client(api_key: str) -> anthropic.Anthropic:
+    """Return a shared client per API key so its connection pool is reused"""
+    return anthropic.Anthropic(api_key=api_key)
 
 
 class AIGenerator:
     """Handles interactions with Anthropic's Claude API for generating responses"""
 
+    # Rough characters-per-token ratio for English text, used to budget history
+    CHARS_PER_TOKEN = 4
+
     # Static system prompt to avoid rebuilding on each call
     SYSTEM_PROMPT = """ You are an AI assistant specialized in course materials and educational content with access to comprehensive search and outline tools for course information.
 
@@ -42,12 +59,51 @@ All responses must be:
 Provide only the direct answer to what was asked.
 """
 
-    def __init__(self, api_key: str, model: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        embedding_fn: Optional[Callable[[List[str]], List]] = None,
+        semantic_threshold: float = 0.92,
+        stream_idle_timeout: float = 30.0,
+        history_max_tokens: int = 2000,
+    ):
+        self.client = _get_client(api_key)
         self.model = model
 
-        # Pre-build base API parameters
-        self.base_params = {"model": self.model, "temperature": 0, "max_tokens": 800}
+        # Seconds without response activity before an API call is abandoned;
+        # also the read timeout for non-streamed calls
+        self.stream_idle_timeout = stream_idle_timeout
+
+        # Approximate token budget for conversation history in the system prompt
+        self.history_max_tokens = history_max_tokens
+
+        # Fixed sampling settings, read by _api_params on every call
+        self.temperature = 0
+        self.max_tokens = 800
+        self.base_params = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+
+        # Pre-build the cacheable system block so every call shares the same prefix
+        self._system_blocks = [
+            {
+                "type": "text",
+                "text": self.SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+
+        # temperature=0 makes identical calls deterministic, so reuse their responses
+        self.response_cache = LLMCache()
+
+        # Optional embedding-similarity cache for paraphrased standalone questions
+        self.embedding_fn = embedding_fn
+        self.semantic_cache = (
+            SemanticCache(threshold=semantic_threshold) if embedding_fn else None
+        )
 
     def generate_response(
         self,
@@ -56,6 +112,8 @@ Provide only the direct answer to what was asked.
         tools: Optional[List] = None,
         tool_manager=None,
         max_rounds: int = 2,
+        history_messages: Optional[List[Dict]] = None,
+        cache_query: Optional[str] = None,
     ) -> str:
         """
         Generate AI response with optional tool usage and conversation context.
@@ -67,52 +125,249 @@ Provide only the direct answer to what was asked.
             tools: Available tools the AI can use
             tool_manager: Manager to execute tools
             max_rounds: Maximum number of tool calling rounds (default 2)
+            history_messages: Previous turns as role/content message dicts,
+                sent ahead of the query instead of a history string
+            cache_query: Text matched against the semantic cache instead of
+                query, e.g. the bare question without a prompt template
 
         Returns:
             Generated response as string
         """
 
-        # Build system content efficiently - avoid string ops when possible
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history
-            else self.SYSTEM_PROMPT
+        # Paraphrases of an earlier standalone question reuse its answer
+        query_embedding = None
+        if (
+            self.semantic_cache is not None
+            and not conversation_history
+            and not history_messages
+        ):
+            cache_text = query if cache_query is None else cache_query
+            query_embedding = self.embedding_fn([cache_text])[0]
+            cached_answer = self.semantic_cache.lookup(query_embedding)
+            if cached_answer is not None:
+                return cached_answer
+
+        # Build system blocks - static prompt and history are separate cache breakpoints
+        system_content = self._build_system(conversation_history)
+
+        messages = self._initial_messages(query, history_messages)
+        answer, complete = self._run_conversation(
+            messages, system_content, tools, tool_manager, max_rounds
         )
 
-        # Initialize conversation state
-        messages = [{"role": "user", "content": query}]
+        if query_embedding is not None and complete:
+            self.semantic_cache.add(query_embedding, answer)
+
+        return answer
+
+    def clear_semantic_cache(self):
+        """Drop cached paraphrase answers, e.g. after new course content is added"""
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
+    def generate_responses_batch(
+        self,
+        queries: List[str],
+        tools: Optional[List] = None,
+        tool_manager=None,
+        max_rounds: int = 2,
+        max_workers: int = 4,
+    ) -> List[str]:
+        """
+        Generate responses for independent queries in parallel.
+
+        Each query runs through generate_response on a bounded thread pool, so
+        at most max_workers API requests are in flight at once.
+
+        Args:
+            queries: Standalone user questions
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            max_rounds: Maximum number of tool calling rounds per query
+            max_workers: Maximum number of concurrent API requests
+
+        Returns:
+            Generated responses in the same order as queries
+        """
+        if len(queries) <= 1 or max_workers <= 1:
+            return [
+                self.generate_response(
+                    query, tools=tools, tool_manager=tool_manager, max_rounds=max_rounds
+                )
+                for query in queries
+            ]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as executor:
+            return list(
+                executor.map(
+                    lambda query: self.generate_response(
+                        query,
+                        tools=tools,
+                        tool_manager=tool_manager,
+                        max_rounds=max_rounds,
+                    ),
+                    queries,
+                )
+            )
+
+    def stream_response(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+        max_rounds: int = 2,
+        history_messages: Optional[List[Dict]] = None,
+    ) -> Iterator[str]:
+        """
+        Stream an AI response as text chunks while it is being generated.
+        Tool rounds behave as in generate_response; text from every round is
+        yielded as soon as it arrives.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            max_rounds: Maximum number of tool calling rounds (default 2)
+            history_messages: Previous turns as role/content message dicts
+
+        Yields:
+            Response text chunks
+
+        Raises:
+            TimeoutError: If the stream stalls for longer than stream_idle_timeout
+        """
+        system_content = self._build_system(conversation_history)
+        messages = self._initial_messages(query, history_messages)
+
+        for _ in range(max_rounds):
+            api_params = self._api_params(messages, system_content)
+            if tools:
+                api_params["tools"] = self._tools_with_cache(tools)
+                api_params["tool_choice"] = {"type": "auto"}
+
+            response = yield from self._stream_message(api_params)
+
+            if response.stop_reason != "tool_use":
+                return
+
+            if not tool_manager:
+                if not any(block.type == "text" for block in response.content):
+                    yield "Tool requested but no tool manager available"
+                return
+
+            try:
+                messages, _ = self._execute_tools_for_round(
+                    response, messages, tool_manager
+                )
+            except Exception as e:
+                yield (
+                    f"Tool execution failed: {str(e)}. "
+                    "Unable to provide complete response."
+                )
+                return
+
+        # Tool rounds exhausted - stream the synthesized answer without tool use
+        yield from self._stream_message(
+            self._final_params(messages, system_content, tools)
+        )
+
+    def _stream_message(self, api_params: Dict[str, Any]) -> Generator[str, None, Any]:
+        """
+        Stream one Messages API call, yielding text deltas as they arrive.
+
+        The read timeout drops a connection that goes silent, while the idle
+        check also catches streams kept alive by pings that stop making
+        progress. Deterministic calls are served from and stored in the
+        response cache like _create_message.
+
+        Args:
+            api_params: Keyword arguments for client.messages.stream
+
+        Yields:
+            Text deltas of the response
+
+        Returns:
+            The final API response message
+        """
+        cacheable = api_params.get("temperature") == 0
+        if cacheable:
+            key = self._cache_key(api_params)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                for block in cached.content:
+                    if block.type == "text":
+                        yield block.text
+                return cached
+
+        last_activity = time.monotonic()
+        with self.client.messages.stream(
+            **api_params, timeout=self.stream_idle_timeout
+        ) as stream:
+            for event in stream:
+                if time.monotonic() - last_activity > self.stream_idle_timeout:
+                    raise TimeoutError(
+                        f"No stream activity for {self.stream_idle_timeout} seconds"
+                    )
+                # Keep-alive pings hold the socket open but are not progress
+                if event.type == "ping":
+                    continue
+                if event.type == "text":
+                    yield event.text
+                # Restart the clock after the consumer is done with the chunk
+                last_activity = time.monotonic()
+            response = stream.get_final_message()
+
+        if cacheable:
+            self.response_cache.set(key, response)
+        return response
+
+    def _run_conversation(
+        self,
+        messages: List[Dict],
+        system_content: List[Dict],
+        tools: Optional[List],
+        tool_manager,
+        max_rounds: int,
+    ) -> Tuple[str, bool]:
+        """
+        Run the tool-calling loop for a single query.
+
+        Args:
+            messages: Conversation messages ending with the user's query
+            system_content: System prompt blocks
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            max_rounds: Maximum number of tool calling rounds
+
+        Returns:
+            Tuple of (response text, whether it is a complete answer rather
+            than a tool failure message)
+        """
         current_round = 1
 
         while current_round <= max_rounds:
             # Prepare API call parameters for current round
-            api_params = {
-                **self.base_params,
-                "messages": messages.copy(),
-                "system": system_content,
-            }
+            api_params = self._api_params(messages, system_content)
 
             # Add tools if available (keep tools available for all rounds)
             if tools:
-                api_params["tools"] = tools
+                api_params["tools"] = self._tools_with_cache(tools)
                 api_params["tool_choice"] = {"type": "auto"}
 
             # Get response from Claude
-            response = self.client.messages.create(**api_params)
+            response = self._create_message(api_params)
 
             # Handle tool execution if needed
             if response.stop_reason == "tool_use":
                 if not tool_manager:
                     # No tool manager available but tool use requested
-                    # Check if we have actual text content (not tool blocks)
-                    if (
-                        response.content
-                        and hasattr(response.content[0], "text")
-                        and hasattr(response.content[0], "type")
-                        and getattr(response.content[0], "type", None) != "tool_use"
-                    ):
-                        return response.content[0].text
-                    else:
-                        return "Tool requested but no tool manager available"
+                    # Return leading text content if there is any
+                    first = response.content[0] if response.content else None
+                    if getattr(first, "type", None) == "text":
+                        return first.text, True
+                    return "Tool requested but no tool manager available", False
 
                 try:
                     # Execute tools and get results
@@ -123,19 +378,214 @@ Provide only the direct answer to what was asked.
                     # Check if this is the final round
                     if current_round >= max_rounds:
                         # Final round - make one more call without tools for final response
-                        return self._make_final_response(messages, system_content)
+                        return (
+                            self._make_final_response(messages, system_content, tools),
+                            True,
+                        )
 
                     # Continue to next round
                     current_round += 1
                 except Exception as e:
                     # Tool execution failed - handle gracefully
-                    return f"Tool execution failed: {str(e)}. Unable to provide complete response."
+                    return (
+                        f"Tool execution failed: {str(e)}. Unable to provide complete response.",
+                        False,
+                    )
             else:
                 # No tool use - return response
-                return response.content[0].text
+                return response.content[0].text, True
 
         # Fallback: shouldn't reach here, but return last response
-        return response.content[0].text
+        return response.content[0].text, True
+
+    def _api_params(
+        self, messages: List[Dict], system_content: List[Dict]
+    ) -> Dict[str, Any]:
+        """
+        Build Messages API parameters for one call.
+
+        A dict literal avoids copying and rehashing base_params on every
+        round of the tool loop.
+
+        Args:
+            messages: Conversation messages to send
+            system_content: System prompt blocks
+
+        Returns:
+            Keyword arguments for the Messages API
+        """
+        return {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "messages": messages,
+            "system": system_content,
+        }
+
+    def _initial_messages(
+        self, query: str, history_messages: Optional[List[Dict]]
+    ) -> List[Dict]:
+        """
+        Build the opening messages: prior turns followed by the new query.
+
+        Prior turns are sent as real messages rather than a formatted string,
+        so the same session produces the same message prefix on every turn.
+        The newest prior turn carries a cache breakpoint for that prefix.
+
+        Args:
+            query: The user's question or request
+            history_messages: Previous turns as role/content message dicts
+
+        Returns:
+            Messages for the first API call
+        """
+        if not history_messages:
+            return [{"role": "user", "content": query}]
+
+        last = history_messages[-1]
+        marked_last = {
+            "role": last["role"],
+            "content": [
+                {
+                    "type": "text",
+                    "text": last["content"],
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+        }
+        return [
+            *history_messages[:-1],
+            marked_last,
+            {"role": "user", "content": query},
+        ]
+
+    def _create_message(self, api_params: Dict[str, Any]):
+        """
+        Call the Messages API, serving repeated deterministic calls from cache.
+
+        Caching happens per API call rather than per query, so tool calls are
+        still executed (and sources tracked) even when every response is a hit.
+        The read timeout makes a stalled connection fail fast instead of
+        waiting out the SDK's ten-minute default.
+
+        Args:
+            api_params: Keyword arguments for client.messages.create
+
+        Returns:
+            API response message
+        """
+        if api_params.get("temperature") != 0:
+            return self.client.messages.create(
+                **api_params, timeout=self.stream_idle_timeout
+            )
+
+        key = self._cache_key(api_params)
+        response = self.response_cache.get(key)
+        if response is None:
+            response = self.client.messages.create(
+                **api_params, timeout=self.stream_idle_timeout
+            )
+            self.response_cache.set(key, response)
+        return response
+
+    def _cache_key(self, api_params: Dict[str, Any]) -> str:
+        """
+        Hash API parameters into a response cache key.
+
+        Leading and trailing whitespace of plain-text user turns is ignored
+        for the key only, so padded copies of a question share an entry while
+        the model still receives the text exactly as typed. Inner whitespace
+        is kept, since indentation in pasted code can change the answer.
+
+        Args:
+            api_params: Keyword arguments for the Messages API
+
+        Returns:
+            Cache key for the response
+        """
+        messages = []
+        for message in api_params["messages"]:
+            content = message["content"]
+            if message["role"] == "user" and isinstance(content, str):
+                message = {**message, "content": content.strip()}
+            messages.append(message)
+        return LLMCache.make_key({**api_params, "messages": messages})
+
+    def _build_system(self, conversation_history: Optional[str]) -> List[Dict]:
+        """
+        Build the system blocks for an API call.
+
+        The static SYSTEM_PROMPT block is reused as-is so Anthropic can serve it
+        from the prompt cache; conversation history gets its own breakpoint.
+
+        Args:
+            conversation_history: Previous messages for context
+
+        Returns:
+            List of system content blocks
+        """
+        if not conversation_history:
+            return self._system_blocks
+
+        history = self._compact_history(conversation_history)
+        return [
+            self._system_blocks[0],
+            {
+                "type": "text",
+                "text": f"Previous conversation:\n{history}",
+                "cache_control": {"type": "ephemeral"},
+            },
+        ]
+
+    def _compact_history(self, conversation_history: str) -> str:
+        """
+        Trim conversation history to the most recent turns that fit the budget.
+
+        Token counts are estimated from characters rather than asking the API,
+        so compaction adds no round trip. Dropped turns are replaced by a
+        marker so the model knows earlier context existed.
+
+        Args:
+            conversation_history: Formatted conversation history
+
+        Returns:
+            History no longer than roughly history_max_tokens tokens
+        """
+        max_chars = self.history_max_tokens * self.CHARS_PER_TOKEN
+        if len(conversation_history) <= max_chars:
+            return conversation_history
+
+        kept = []
+        used = 0
+        for turn in reversed(_TURN_BOUNDARY.split(conversation_history)):
+            used += len(turn) + 1
+            if used > max_chars:
+                break
+            kept.append(turn)
+
+        if not kept:
+            # Even the newest turn is over budget - keep its beginning
+            newest = _TURN_BOUNDARY.split(conversation_history)[-1]
+            kept.append(newest[:max_chars])
+
+        return "\n".join(["[Earlier turns omitted]"] + kept[::-1])
+
+    def _tools_with_cache(self, tools: List[Dict]) -> List[Dict]:
+        """
+        Return tools with a cache breakpoint on the last definition.
+
+        Anthropic caches everything up to and including the marked tool, so the
+        whole schema is billed once per cache window instead of every round.
+        The caller's list is never mutated; the copy is rebuilt per call since
+        it is shallow and this generator may be shared across threads.
+
+        Args:
+            tools: Tool definitions to send to the API
+
+        Returns:
+            Copy of tools with cache_control on the last definition
+        """
+        return tools[:-1] + [{**tools[-1], "cache_control": {"type": "ephemeral"}}]
 
     def _execute_tools_for_round(self, response, messages: List[Dict], tool_manager):
         """
@@ -152,97 +602,105 @@ Provide only the direct answer to what was asked.
         # Add AI's tool use response to conversation
         messages.append({"role": "assistant", "content": response.content})
 
-        # Execute all tool calls and collect results
-        tool_results = []
-        for content_block in response.content:
-            if content_block.type == "tool_use":
-                tool_result = tool_manager.execute_tool(
-                    content_block.name, **content_block.input
-                )
+        # Execute all tool calls; the manager runs several concurrently
+        tool_blocks = [
+            block
+            for block in response.content
+            if getattr(block, "type", None) == "tool_use"
+        ]
+        tool_outputs = tool_manager.execute_tools_batch(
+            [(block.name, block.input) for block in tool_blocks]
+        )
 
-                tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": content_block.id,
-                        "content": tool_result,
-                    }
-                )
+        tool_results = [
+            {
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": output,
+            }
+            for block, output in zip(tool_blocks, tool_outputs)
+        ]
 
         # Add tool results as user message for next round
         if tool_results:
+            self._mark_cache_breakpoint(messages, tool_results)
             messages.append({"role": "user", "content": tool_results})
 
         return messages, tool_results
 
-    def _make_final_response(self, messages: List[Dict], system_content: str) -> str:
+    def _mark_cache_breakpoint(self, messages: List[Dict], tool_results: List[Dict]):
         """
-        Make final API call without tools to get synthesized response.
+        Move the message cache breakpoint onto the newest tool result.
+
+        Anthropic caches the prefix up to the marked block, so earlier rounds are
+        re-read at the cached rate. Only the previous tool-result turn loses its
+        marker, which keeps the history breakpoint and stays within the
+        four-breakpoint limit (system prompt, history, tools, latest result).
 
         Args:
             messages: Current conversation messages
-            system_content: System prompt content
-
-        Returns:
-            Final response text
+            tool_results: Tool result blocks about to be appended
         """
-        # Prepare final API call without tools
-        final_params = {
-            **self.base_params,
-            "messages": messages,
-            "system": system_content,
-        }
-
-        # Get final response
-        final_response = self.client.messages.create(**final_params)
-        return final_response.content[0].text
-
-    def _handle_tool_execution(
-        self, initial_response, base_params: Dict[str, Any], tool_manager
-    ):
+        for message in reversed(messages):
+            content = message["content"]
+            if message["role"] == "user" and isinstance(content, list):
+                if any(
+                    isinstance(block, dict) and block.get("type") == "tool_result"
+                    for block in content
+                ):
+                    for block in content:
+                        block.pop("cache_control", None)
+                    break
+
+        tool_results[-1]["cache_control"] = {"type": "ephemeral"}
+
+    def _final_params(
+        self,
+        messages: List[Dict],
+        system_content: List[Dict],
+        tools: Optional[List] = None,
+    ) -> Dict[str, Any]:
         """
-        Handle execution of tool calls and get follow-up response.
+        Build parameters for the final call that must answer without tools.
+
+        Tools stay in the request with tool_choice "none" instead of being
+        dropped: removing them would change the cached prefix and miss the
+        prompt cache for the tools and system blocks.
 
         Args:
-            initial_response: The response containing tool use requests
-            base_params: Base API parameters
-            tool_manager: Manager to execute tools
+            messages: Current conversation messages
+            system_content: System prompt blocks
+            tools: Tools sent in earlier rounds, if any
 
         Returns:
-            Final response text after tool execution
+            Keyword arguments for the Messages API
         """
-        # Start with existing messages
-        messages = base_params["messages"].copy()
-
-        # Add AI's tool use response
-        messages.append({"role": "assistant", "content": initial_response.content})
+        final_params = self._api_params(messages, system_content)
+        if tools:
+            final_params["tools"] = self._tools_with_cache(tools)
+            final_params["tool_choice"] = {"type": "none"}
+        return final_params
 
-        # Execute all tool calls and collect results
-        tool_results = []
-        for content_block in initial_response.content:
-            if content_block.type == "tool_use":
-                tool_result = tool_manager.execute_tool(
-                    content_block.name, **content_block.input
-                )
-
-                tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": content_block.id,
-                        "content": tool_result,
-                    }
-                )
+    def _make_final_response(
+        self,
+        messages: List[Dict],
+        system_content: List[Dict],
+        tools: Optional[List] = None,
+    ) -> str:
+        """
+        Make final API call with tool use disabled to get synthesized response.
 
-        # Add tool results as single message
-        if tool_results:
-            messages.append({"role": "user", "content": tool_results})
+        Args:
+            messages: Current conversation messages
+            system_content: System prompt blocks
+            tools: Tools sent in earlier rounds, if any
 
-        # Prepare final API call without tools
-        final_params = {
-            **self.base_params,
-            "messages": messages,
-            "system": base_params["system"],
-        }
+        Returns:
+            Final response text
+        """
+        # Prepare final API call with tool use disabled
+        final_params = self._final_params(messages, system_content, tools)
 
         # Get final response
-        final_response = self.client.messages.create(**final_params)
+        final_response = self._create_message(final_params)
         return final_response.content[0].text
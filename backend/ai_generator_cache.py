@@ -0,0 +1,66 @@
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+from cache import TTLCache
+
+
+class LLMCache(TTLCache):
+    """In-memory LRU cache for deterministic (temperature 0) Claude responses"""
+
+
+class SemanticCache:
+    """Answer cache matched by cosine similarity of query embeddings"""
+
+    def __init__(self, threshold: float = 0.92, max_size: int = 1024):
+        self.threshold = threshold
+        self.max_size = max_size
+        self._embeddings: Optional[np.ndarray] = None  # (n, dim) unit vectors
+        self._answers: List[str] = []
+        self._next_slot = 0  # Oldest entry, overwritten once the cache is full
+        self._lock = threading.Lock()
+
+    def lookup(self, embedding: Sequence[float]) -> Optional[str]:
+        """Return the answer of the most similar cached query above threshold"""
+        query = _normalize(embedding)
+        with self._lock:
+            if self._embeddings is None:
+                return None
+
+            similarities = self._embeddings @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return self._answers[best]
+
+    def add(self, embedding: Sequence[float], answer: str):
+        """Cache an answer for a query embedding"""
+        vector = _normalize(embedding)
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = vector[np.newaxis, :]
+                self._answers.append(answer)
+            elif len(self._answers) < self.max_size:
+                self._embeddings = np.vstack([self._embeddings, vector])
+                self._answers.append(answer)
+            else:
+                self._embeddings[self._next_slot] = vector
+                self._answers[self._next_slot] = answer
+                self._next_slot = (self._next_slot + 1) % self.max_size
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._embeddings = None
+            self._answers = []
+            self._next_slot = 0
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+
+def _normalize(embedding: Sequence[float]) -> np.ndarray:
+    """Convert an embedding to a float32 unit vector"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
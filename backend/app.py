@@ -12,6 +12,7 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from rag_system import RAGSystem
+from starlette.concurrency import run_in_threadpool
 
 # Initialize FastAPI app
 app = FastAPI(title="Course Materials RAG System", root_path="")
@@ -74,8 +75,11 @@ async def query_documents(request: QueryRequest):
         if not session_id:
             session_id = rag_system.session_manager.create_session()
 
-        # Process query using RAG system
-        answer, sources = rag_system.query(request.query, session_id)
+        # Process query in the threadpool so the blocking Claude/ChromaDB calls
+        # don't stall the event loop for concurrent requests
+        answer, sources = await run_in_threadpool(
+            rag_system.query, request.query, session_id
+        )
 
         return QueryResponse(answer=answer, sources=sources, session_id=session_id)
     except Exception as e:
@@ -86,7 +90,7 @@ async def query_documents(request: QueryRequest):
 async def get_course_stats():
     """Get course analytics and statistics"""
     try:
-        analytics = rag_system.get_course_analytics()
+        analytics = await run_in_threadpool(rag_system.get_course_analytics)
         return CourseStats(
             total_courses=analytics["total_courses"],
             course_titles=analytics["course_titles"],
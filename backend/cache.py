@@ -0,0 +1,78 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson is normally installed alongside chromadb
+    orjson = None
+
+_ORJSON_OPTIONS = (
+    0
+    if orjson is None
+    else orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+)
+
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries expire after ttl_seconds"""
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+        """Hash a dict of parameters into a stable cache key"""
+        if orjson is not None:
+            payload = orjson.dumps(
+                params, default=_json_default, option=_ORJSON_OPTIONS
+            )
+        else:
+            payload = json.dumps(params, sort_keys=True, default=_json_default).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize pydantic models (e.g. SDK content blocks) by value"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    return str(obj)
@@ -24,6 +24,12 @@ class Config:
     MAX_RESULTS: int = 5  # Maximum search results to return
     MAX_HISTORY: int = 2  # Number of conversation messages to remember
 
+    # Response caching settings
+    SEMANTIC_CACHE_ENABLED: bool = False  # Reuse answers for paraphrased questions
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92  # Minimum cosine similarity for a hit
+    SEARCH_CACHE_SIZE: int = 1024  # Course searches kept in the result cache
+    SEARCH_CACHE_TTL: float = 300  # Seconds before a cached search result expires
+
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
 
@@ -2,6 +2,7 @@ import os
 from typing import Dict, List, Optional, Tuple
 
 from ai_generator import AIGenerator
+from cache import TTLCache
 from document_processor import DocumentProcessor
 from models import Course, CourseChunk, Lesson
 from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
@@ -22,14 +23,30 @@ class RAGSystem:
         self.vector_store = VectorStore(
             config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS
         )
-        self.ai_generator = AIGenerator(
-            config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL
-        )
+        if config.SEMANTIC_CACHE_ENABLED:
+            # Reuse the vector store's embedding model to match paraphrases
+            self.ai_generator = AIGenerator(
+                config.ANTHROPIC_API_KEY,
+                config.ANTHROPIC_MODEL,
+                embedding_fn=self.vector_store.embedding_function,
+                semantic_threshold=config.SEMANTIC_CACHE_THRESHOLD,
+            )
+        else:
+            self.ai_generator = AIGenerator(
+                config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL
+            )
         self.session_manager = SessionManager(config.MAX_HISTORY)
 
         # Initialize search tools
         self.tool_manager = ToolManager()
-        self.search_tool = CourseSearchTool(self.vector_store)
+        self.search_tool = CourseSearchTool(
+            self.vector_store,
+            cache=TTLCache(
+                max_size=config.SEARCH_CACHE_SIZE,
+                ttl_seconds=config.SEARCH_CACHE_TTL,
+            ),
+            embedding_fn=self.vector_store.embedding_function,
+        )
         self.outline_tool = CourseOutlineTool(self.vector_store)
         self.tool_manager.register_tool(self.search_tool)
         self.tool_manager.register_tool(self.outline_tool)
@@ -55,6 +72,7 @@ class RAGSystem:
 
             # Add course content chunks to vector store
             self.vector_store.add_course_content(course_chunks)
+            self._clear_caches()
 
             return course, len(course_chunks)
         except Exception as e:
@@ -117,6 +135,10 @@ class RAGSystem:
                 except Exception as e:
                     print(f"Error processing {file_name}: {e}")
 
+        # Cached searches and answers may predate the cleared or new content
+        if clear_existing or total_courses:
+            self._clear_caches()
+
         return total_courses, total_chunks
 
     def query(
@@ -135,17 +157,18 @@ class RAGSystem:
         # Create prompt for the AI with clear instructions
         prompt = f"""Answer this question about course materials: {query}"""
 
-        # Get conversation history if session exists
+        # Get conversation history as messages if session exists
         history = None
         if session_id:
-            history = self.session_manager.get_conversation_history(session_id)
+            history = self.session_manager.get_conversation_messages(session_id)
 
         # Generate response using AI with tools
         response = self.ai_generator.generate_response(
             query=prompt,
-            conversation_history=history,
+            history_messages=history,
             tools=self.tool_manager.get_tool_definitions(),
             tool_manager=self.tool_manager,
+            cache_query=query,
         )
 
         # Get sources from the search tool
@@ -161,6 +184,11 @@ class RAGSystem:
         # Return response with sources from tool searches
         return response, sources
 
+    def _clear_caches(self):
+        """Drop cached searches and answers that may predate new course content"""
+        self.search_tool.clear_cache()
+        self.ai_generator.clear_semantic_cache()
+
     def get_course_analytics(self) -> Dict:
         """Get analytics about the course catalog"""
         return {
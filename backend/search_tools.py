@@ -1,12 +1,109 @@
+import hashlib
+import sys
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Protocol
-
+from collections import abc
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+)
+
+from cache import TTLCache
 from vector_store import SearchResults, VectorStore
 
 
+@dataclass(frozen=True, slots=True)
+class SourceList(abc.Sequence):
+    """Search sources stored as parallel tuples of texts and links
+
+    Indexing yields {"text": ..., "link": ...} dicts, so callers can treat it
+    like the list of source dicts the UI expects.
+    """
+
+    texts: Tuple[str, ...] = ()
+    links: Tuple[Optional[str], ...] = ()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        return {"text": self.texts[index], "link": self.links[index]}
+
+    def to_list(self) -> List[Dict[str, Optional[str]]]:
+        """Return the sources as a list of {"text", "link"} dicts"""
+        return [
+            {"text": text, "link": link} for text, link in zip(self.texts, self.links)
+        ]
+
+
+class EmbeddingCache(TTLCache):
+    """LRU cache of query embeddings, keyed by embedding function and query text"""
+
+    def __init__(self, max_size: int = 10_000):
+        # Embeddings of a fixed model never go stale, so entries do not expire
+        super().__init__(max_size=max_size, ttl_seconds=float("inf"))
+
+    def get_or_compute(
+        self,
+        query: str,
+        embedding_fn: Callable[[List[str]], Sequence[Sequence[float]]],
+    ) -> Sequence[float]:
+        """Return the cached embedding for query, embedding it on a miss"""
+        # Each entry keeps its embedding_fn alive, so no other function can
+        # reuse that id and read vectors from a different model
+        key = self.make_key({"embedding_fn": id(embedding_fn), "query": query})
+        entry = self.get(key)
+        if entry is None:
+            entry = (embedding_fn, embedding_fn([query])[0])
+            self.set(key, entry)
+        return entry[1]
+
+
+# Shared by every search tool so a query is embedded once, whatever its filters
+query_embedding_cache = EmbeddingCache()
+
+# Reads both chunk metadata fields in one C-level call on the common path
+_COURSE_AND_LESSON = itemgetter("course_title", "lesson_number")
+
+
+def _search_cache_key(
+    query: str, course_name: Optional[str], lesson_number: Optional[int]
+) -> str:
+    """Hash search arguments field by field, without building a joined copy"""
+    digest = hashlib.blake2b(query.encode(), digest_size=16)
+    digest.update(b"\0")
+    if course_name:
+        digest.update(course_name.encode())
+    digest.update(b"\0")
+    if lesson_number is not None:
+        digest.update(str(lesson_number).encode())
+    return digest.hexdigest()
+
+
+# Shared worker pool for tool calls that arrive together in one model turn
+_TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tool")
+
+# Marks context variables that had no value before a batch of tool calls
+_UNSET = object()
+
+
 class Tool(ABC):
     """Abstract base class for all tools"""
 
+    __slots__ = ()  # Lets subclasses opt out of a per-instance __dict__
+
     @abstractmethod
     def get_tool_definition(self) -> Dict[str, Any]:
         """Return Anthropic tool definition for this tool"""
@@ -21,34 +118,72 @@ class Tool(ABC):
 class CourseSearchTool(Tool):
     """Tool for searching course content with semantic course name matching"""
 
-    def __init__(self, vector_store: VectorStore):
+    # Empty-result messages indexed by (has course filter, has lesson filter)
+    _EMPTY_TEMPLATES = (
+        "No relevant content found.",
+        "No relevant content found in lesson {lesson}.",
+        "No relevant content found in course '{course}'.",
+        "No relevant content found in course '{course}' in lesson {lesson}.",
+    )
+
+    # last_sources is a context-local property over the _sources variable
+    __slots__ = ("store", "cache", "embedding_fn", "_sources")
+
+    # Static schema, built once and shared by every instance and request;
+    # callers must treat it as read-only
+    _TOOL_DEFINITION = {
+        "name": "search_course_content",
+        "description": "Search course materials with smart course name matching and lesson filtering",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "What to search for in the course content",
+                },
+                "course_name": {
+                    "type": "string",
+                    "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')",
+                },
+                "lesson_number": {
+                    "type": "integer",
+                    "description": "Specific lesson number to search within (e.g. 1, 2, 3)",
+                },
+            },
+            "required": ["query"],
+        },
+    }
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        cache: Optional[TTLCache] = None,
+        embedding_fn: Optional[Callable] = None,
+    ):
         self.store = vector_store
-        self.last_sources = []  # Track sources from last search
+        self.cache = cache  # Formatted results and sources keyed by search args
+        self.embedding_fn = embedding_fn  # Pre-embeds queries when provided
+
+        # Sources of this tool's latest search, kept per request context (each
+        # request thread and asyncio task) so concurrent queries never read
+        # each other's sources. One variable per tool keeps separate tools
+        # and tool managers in the same context apart.
+        self._sources: ContextVar[SourceList] = ContextVar(
+            f"last_sources_{id(self)}", default=SourceList()
+        )
+
+    @property
+    def last_sources(self) -> SourceList:
+        """Sources from the last search in the current context"""
+        return self._sources.get()
+
+    @last_sources.setter
+    def last_sources(self, sources: SourceList):
+        self._sources.set(sources)
 
     def get_tool_definition(self) -> Dict[str, Any]:
         """Return Anthropic tool definition for this tool"""
-        return {
-            "name": "search_course_content",
-            "description": "Search course materials with smart course name matching and lesson filtering",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "What to search for in the course content",
-                    },
-                    "course_name": {
-                        "type": "string",
-                        "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')",
-                    },
-                    "lesson_number": {
-                        "type": "integer",
-                        "description": "Specific lesson number to search within (e.g. 1, 2, 3)",
-                    },
-                },
-                "required": ["query"],
-            },
-        }
+        return self._TOOL_DEFINITION
 
     def execute(
         self,
@@ -67,87 +202,141 @@ class CourseSearchTool(Tool):
         Returns:
             Formatted search results or error message
         """
-
-        # Use the vector store's unified search interface
-        results = self.store.search(
-            query=query, course_name=course_name, lesson_number=lesson_number
-        )
-
-        # Handle errors
+        # Blank queries cannot match anything; skip embedding and search
+        if not query or not query.strip():
+            self.last_sources = SourceList()
+            return self._EMPTY_TEMPLATES[0]
+
+        # Serve repeated searches without another embedding pass and Chroma query;
+        # queries differing only in case or spacing share an entry
+        cache_key = None
+        if self.cache is not None:
+            cache_key = _search_cache_key(
+                " ".join(query.casefold().split()), course_name, lesson_number
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                result, self.last_sources = cached
+                return result
+
+        # Use the vector store's unified search interface; report failures to
+        # the model as a tool result instead of failing the whole request
+        try:
+            if self.embedding_fn is not None:
+                results = self.store.search(
+                    query=query,
+                    course_name=course_name,
+                    lesson_number=lesson_number,
+                    query_embedding=query_embedding_cache.get_or_compute(
+                        query, self.embedding_fn
+                    ),
+                )
+            else:
+                results = self.store.search(
+                    query=query, course_name=course_name, lesson_number=lesson_number
+                )
+        except Exception as e:
+            self.last_sources = SourceList()
+            return f"Search error: {type(e).__name__}: {e}"
+
+        # Handle errors; these are not cached so transient failures can recover
         if results.error:
             return results.error
 
         # Handle empty results
         if results.is_empty():
-            filter_info = ""
-            if course_name:
-                filter_info += f" in course '{course_name}'"
-            if lesson_number:
-                filter_info += f" in lesson {lesson_number}"
-            return f"No relevant content found{filter_info}."
-
-        # Format and return results
-        return self._format_results(results)
-
-    def _format_results(self, results: SearchResults) -> str:
-        """Format search results with course and lesson context"""
-        formatted = []
-        sources = []  # Track sources for the UI
-
-        for doc, meta in zip(results.documents, results.metadata):
-            course_title = meta.get("course_title", "unknown")
-            lesson_num = meta.get("lesson_number")
-
-            # Build context header
-            header = f"[{course_title}"
-            if lesson_num is not None:
-                header += f" - Lesson {lesson_num}"
-            header += "]"
+            template = self._EMPTY_TEMPLATES[
+                bool(course_name) << 1 | bool(lesson_number)
+            ]
+            result = template.format(course=course_name, lesson=lesson_number)
+            self.last_sources = SourceList()
+        else:
+            result = self._format_results(results)
 
-            # Track source for the UI with lesson link if available
-            source_text = course_title
-            if lesson_num is not None:
-                source_text += f" - Lesson {lesson_num}"
+        if cache_key is not None:
+            self.cache.set(cache_key, (result, self.last_sources))
+        return result
 
-            # Try to get lesson link from vector store
-            lesson_link = None
-            if lesson_num is not None:
-                lesson_link = self.store.get_lesson_link(course_title, lesson_num)
+    def clear_cache(self):
+        """Drop cached search results, e.g. after new course content is added"""
+        if self.cache is not None:
+            self.cache.clear()
 
-            # Create source object with text and optional link
-            source = {"text": source_text, "link": lesson_link}
-            sources.append(source)
+    def warmup(
+        self, queries: Iterable[Tuple[str, Optional[str], Optional[int]]]
+    ) -> None:
+        """
+        Pre-populate the embedding and result caches with popular searches.
 
-            formatted.append(f"{header}\n{doc}")
+        Args:
+            queries: (query, course_name, lesson_number) triples to run once
+        """
+        for query, course_name, lesson_number in queries:
+            # execute() reports store failures as text, so one bad query
+            # cannot abort the rest of the warmup
+            self.execute(query, course_name=course_name, lesson_number=lesson_number)
+        # Warmup searches are not part of any request's sources
+        self.last_sources = SourceList()
 
-        # Store sources for retrieval
-        self.last_sources = sources
+    def _format_results(self, results: SearchResults) -> str:
+        """Format search results with course and lesson context"""
+        # One pass builds the context blocks, source labels and link lookups
+        blocks = []
+        labels = []
+        lesson_keys = []
+        for doc, meta in zip(results.documents, results.metadata):
+            try:
+                course_title, lesson_num = _COURSE_AND_LESSON(meta)
+            except KeyError:  # Course-level chunks carry no lesson number
+                course_title = meta.get("course_title", "unknown")
+                lesson_num = meta.get("lesson_number")
+
+            # The source label doubles as the bracketed context header
+            label = (
+                course_title
+                if lesson_num is None
+                else f"{course_title} - Lesson {lesson_num}"
+            )
+            labels.append(label)
+            blocks.append(f"[{label}]\n{doc}")
+            lesson_keys.append((course_title, lesson_num))
+
+        # Fetch every lesson link in one vector store call rather than per row
+        lesson_pairs = [key for key in dict.fromkeys(lesson_keys) if key[1] is not None]
+        links = self.store.get_lesson_links(lesson_pairs) if lesson_pairs else {}
+
+        # Store sources for the UI, with lesson links when a lesson is known
+        self.last_sources = SourceList(
+            tuple(labels), tuple(links.get(key) for key in lesson_keys)
+        )
 
-        return "\n\n".join(formatted)
+        return "\n\n".join(blocks)
 
 
 class CourseOutlineTool(Tool):
     """Tool for retrieving course outlines with complete lesson information"""
 
+    _TOOL_DEFINITION = {
+        "name": "get_course_outline",
+        "description": "Get complete course outline including title, link, and all lessons with numbers and titles",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "course_name": {
+                    "type": "string",
+                    "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')",
+                }
+            },
+            "required": ["course_name"],
+        },
+    }
+
     def __init__(self, vector_store: VectorStore):
         self.store = vector_store
 
     def get_tool_definition(self) -> Dict[str, Any]:
         """Return Anthropic tool definition for this tool"""
-        return {
-            "name": "get_course_outline",
-            "description": "Get complete course outline including title, link, and all lessons with numbers and titles",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "course_name": {
-                        "type": "string",
-                        "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')",
-                    }
-                },
-                "required": ["course_name"],
-            },
-        }
+        return self._TOOL_DEFINITION
 
     def execute(self, course_name: str) -> str:
         """
@@ -211,6 +400,7 @@ class ToolManager:
 
     def __init__(self):
         self.tools = {}
+        self._handlers = {}  # Tool name -> bound execute method
 
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
@@ -218,7 +408,10 @@ class ToolManager:
         tool_name = tool_def.get("name")
         if not tool_name:
             raise ValueError("Tool must have a 'name' in its definition")
+        # Interned keys let lookups by the same name short-circuit on identity
+        tool_name = sys.intern(tool_name)
         self.tools[tool_name] = tool
+        self._handlers[tool_name] = tool.execute
 
     def get_tool_definitions(self) -> list:
         """Get all tool definitions for Anthropic tool calling"""
@@ -226,21 +419,56 @@ class ToolManager:
 
     def execute_tool(self, tool_name: str, **kwargs) -> str:
         """Execute a tool by name with given parameters"""
-        if tool_name not in self.tools:
+        handler = self._handlers.get(tool_name)
+        if handler is None:
             return f"Tool '{tool_name}' not found"
 
-        return self.tools[tool_name].execute(**kwargs)
+        return handler(**kwargs)
+
+    def execute_tools_batch(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """
+        Execute several tool calls concurrently.
+
+        Tool calls mostly wait on vector store I/O, so K calls take about as
+        long as the slowest one. A single call runs inline on the caller's
+        thread.
+
+        Args:
+            calls: (tool_name, kwargs) pairs
+
+        Returns:
+            Tool outputs in the same order as calls
+        """
+        if len(calls) <= 1:
+            return [self.execute_tool(name, **kwargs) for name, kwargs in calls]
+
+        # Run each call in a copy of this context, then carry what the tools
+        # recorded (e.g. last_sources) back so get_last_sources() sees it.
+        # Only variables a call changed are copied, so a call that left a
+        # variable alone cannot reset what an earlier call recorded
+        parent = copy_context()
+        contexts = [copy_context() for _ in calls]
+        futures = [
+            _TOOL_EXECUTOR.submit(context.run, self.execute_tool, name, **kwargs)
+            for context, (name, kwargs) in zip(contexts, calls)
+        ]
+        outputs = [future.result() for future in futures]
+        for context in contexts:
+            for var, value in context.items():
+                if parent.get(var, _UNSET) is not value:
+                    var.set(value)
+        return outputs
 
     def get_last_sources(self) -> list:
         """Get sources from the last search operation"""
         # Check all tools for last_sources attribute
         for tool in self.tools.values():
             if hasattr(tool, "last_sources") and tool.last_sources:
-                return tool.last_sources
+                return list(tool.last_sources)
         return []
 
     def reset_sources(self):
         """Reset sources from all tools that track sources"""
         for tool in self.tools.values():
             if hasattr(tool, "last_sources"):
-                tool.last_sources = []
+                tool.last_sources = SourceList()
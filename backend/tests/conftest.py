@@ -4,25 +4,57 @@ Shared test fixtures and configuration for RAG chatbot tests.
 
 import os
 import sys
-import tempfile
-import shutil
-from typing import Any, Dict, List
-from unittest.mock import MagicMock, Mock, patch
+from types import SimpleNamespace
+from unittest.mock import Mock
 
 import pytest
-from fastapi.testclient import TestClient
 
 # Add the backend directory to the Python path so we can import modules
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, backend_dir)
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
 
-from models import Course, CourseChunk, Lesson
-from vector_store import SearchResults
+# Backend and FastAPI modules are imported inside the fixtures that need them,
+# so selecting only e.g. the AI generator tests never loads ChromaDB
 
+# (mock, configure) pairs for the shared mocks currently in use
+_shared_mocks = []
 
-@pytest.fixture
+
+def _shared_mock(configure):
+    """Yield a Mock that is restored to configure's defaults after every test"""
+    mock = Mock()
+    configure(mock)
+    entry = (mock, configure)
+    _shared_mocks.append(entry)
+    yield mock
+    _shared_mocks.remove(entry)
+
+
+@pytest.fixture(autouse=True)
+def clear_client_cache():
+    """Drop shared Anthropic clients so each test sees its own patched client"""
+    from ai_generator import _get_client
+
+    _get_client.cache_clear()
+    yield
+    _get_client.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_mocks():
+    """Reset calls, return values and side effects set by the previous test"""
+    yield
+    for mock, configure in _shared_mocks:
+        mock.reset_mock(return_value=True, side_effect=True)
+        configure(mock)
+
+
+@pytest.fixture(scope="session")
 def sample_course():
     """Create a sample course for testing"""
+    from models import Course, Lesson
+
     lessons = [
         Lesson(
             lesson_number=1,
@@ -48,9 +80,11 @@ def sample_course():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_course_chunks():
     """Create sample course chunks for testing"""
+    from models import CourseChunk
+
     return [
         CourseChunk(
             content="Python is a high-level programming language known for its simplicity.",
@@ -73,9 +107,11 @@ def sample_course_chunks():
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def successful_search_results():
     """Create successful search results for testing"""
+    from vector_store import SearchResults
+
     return SearchResults(
         documents=[
             "Python is a high-level programming language known for its simplicity.",
@@ -97,79 +133,150 @@ def successful_search_results():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def empty_search_results():
     """Create empty search results for testing"""
+    from vector_store import SearchResults
+
     return SearchResults(documents=[], metadata=[], distances=[])
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def error_search_results():
     """Create error search results for testing"""
+    from vector_store import SearchResults
+
     return SearchResults(
         documents=[], metadata=[], distances=[], error="Database connection failed"
     )
 
 
-@pytest.fixture
-def mock_vector_store():
-    """Create a mock vector store for testing"""
-    mock_store = Mock()
+def _configure_vector_store(mock_store):
+    from vector_store import SearchResults
+
     mock_store.search.return_value = SearchResults(
         documents=[], metadata=[], distances=[]
     )
-    mock_store.get_lesson_link.return_value = "http://example.com/lesson1"
+    mock_store.get_lesson_links.side_effect = lambda pairs: dict.fromkeys(
+        pairs, "http://example.com/lesson1"
+    )
     mock_store._resolve_course_name.return_value = "Python Fundamentals"
     mock_store.get_all_courses_metadata.return_value = []
-    return mock_store
 
 
-@pytest.fixture
-def mock_anthropic_client():
-    """Create a mock Anthropic client for testing"""
-    mock_client = Mock()
+@pytest.fixture(scope="module")
+def mock_vector_store():
+    """Create a mock vector store for testing"""
+    yield from _shared_mock(_configure_vector_store)
+
 
+def _configure_anthropic_client(mock_client):
     # Default response for non-tool calls
-    mock_response = Mock()
-    mock_response.content = [Mock()]
-    mock_response.content[0].text = "This is a test AI response"
-    mock_response.stop_reason = "end_turn"
+    mock_response = SimpleNamespace(
+        content=[SimpleNamespace(type="text", text="This is a test AI response")],
+        stop_reason="end_turn",
+    )
 
     mock_client.messages.create.return_value = mock_response
-    return mock_client
 
 
-@pytest.fixture
-def mock_tool_use_response():
-    """Create a mock Anthropic response that uses tools"""
-    mock_response = Mock()
+@pytest.fixture(scope="module")
+def mock_anthropic_client():
+    """Create a mock Anthropic client for testing"""
+    yield from _shared_mock(_configure_anthropic_client)
+
 
-    # Mock tool use content block
-    tool_block = Mock()
-    tool_block.type = "tool_use"
-    tool_block.name = "search_course_content"
-    tool_block.id = "tool_123"
-    tool_block.input = {"query": "test query", "course_name": "Python"}
+@pytest.fixture(scope="module")
+def patched_anthropic(mock_anthropic_client):
+    """Hand every AIGenerator built in the module the shared mock client"""
+    with pytest.MonkeyPatch.context() as mp:
+        # A Mock class, so tests can assert how the client was constructed
+        mp.setattr(
+            "ai_generator.anthropic.Anthropic",
+            Mock(return_value=mock_anthropic_client),
+        )
+        yield mock_anthropic_client
 
-    mock_response.content = [tool_block]
-    mock_response.stop_reason = "tool_use"
 
-    return mock_response
+@pytest.fixture(scope="module")
+def shared_generator(patched_anthropic):
+    """AIGenerator built once per module on the shared mock Anthropic client"""
+    from ai_generator import AIGenerator
+
+    return AIGenerator("test_api_key", "claude-3-sonnet-20240229")
 
 
 @pytest.fixture
+def ai_generator(shared_generator):
+    """The module's shared generator, restored to its defaults after each test"""
+    defaults = dict(vars(shared_generator))
+    yield shared_generator
+    # Settings a test overrode are put back; the client mock resets itself
+    vars(shared_generator).clear()
+    vars(shared_generator).update(defaults)
+    shared_generator.response_cache.clear()
+
+
+@pytest.fixture
+def mock_tool_manager():
+    """Stand-in ToolManager whose batches run sequentially through execute_tool"""
+    manager = Mock(spec_set=["execute_tool", "execute_tools_batch"])
+    manager.execute_tool.return_value = "Tool execution result"
+    manager.execute_tools_batch.side_effect = lambda calls: [
+        manager.execute_tool(name, **kwargs) for name, kwargs in calls
+    ]
+    return manager
+
+
+@pytest.fixture(scope="session")
+def mock_tool_use_response():
+    """Create a mock Anthropic response that uses tools"""
+    # Tool use content block
+    tool_block = SimpleNamespace(
+        type="tool_use",
+        name="search_course_content",
+        id="tool_123",
+        input={"query": "test query", "course_name": "Python"},
+    )
+
+    return SimpleNamespace(content=[tool_block], stop_reason="tool_use")
+
+
+@pytest.fixture(scope="session")
 def mock_final_response():
     """Create a mock final response after tool execution"""
-    mock_response = Mock()
-    mock_response.content = [Mock()]
-    mock_response.content[0].text = (
-        "Based on the course content, Python is a programming language."
+    text_block = SimpleNamespace(
+        type="text",
+        text="Based on the course content, Python is a programming language.",
     )
-    mock_response.stop_reason = "end_turn"
-    return mock_response
+    return SimpleNamespace(content=[text_block], stop_reason="end_turn")
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
+def make_tool_response():
+    """Factory for Anthropic responses that request a single tool call"""
+
+    def make(name, tool_id, tool_input):
+        tool_block = SimpleNamespace(
+            type="tool_use", name=name, id=tool_id, input=tool_input
+        )
+        return SimpleNamespace(content=[tool_block], stop_reason="tool_use")
+
+    return make
+
+
+@pytest.fixture(scope="module")
+def make_text_response():
+    """Factory for plain-text Anthropic responses"""
+
+    def make(text):
+        text_block = SimpleNamespace(type="text", text=text)
+        return SimpleNamespace(content=[text_block], stop_reason="end_turn")
+
+    return make
+
+
+@pytest.fixture(scope="session")
 def sample_tool_definitions():
     """Create sample tool definitions for testing"""
     return [
@@ -188,7 +295,7 @@ def sample_tool_definitions():
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_config():
     """Create a mock config object for testing"""
     config = Mock()
@@ -198,44 +305,63 @@ def mock_config():
     config.CHUNK_OVERLAP = 100
     config.MAX_RESULTS = 5
     config.MAX_HISTORY = 2
+    config.SEMANTIC_CACHE_ENABLED = False
+    config.SEMANTIC_CACHE_THRESHOLD = 0.92
+    config.SEARCH_CACHE_SIZE = 1024
+    config.SEARCH_CACHE_TTL = 300
     config.CHROMA_PATH = "./test_chroma_db"
     config.EMBEDDING_MODEL = "all-MiniLM-L6-v2"
     return config
 
 
 @pytest.fixture
-def temp_chroma_db():
+def temp_chroma_db(tmp_path):
     """Create a temporary ChromaDB directory for testing"""
-    temp_dir = tempfile.mkdtemp()
-    yield temp_dir
-    shutil.rmtree(temp_dir)
+    return str(tmp_path)
 
 
-@pytest.fixture
-def mock_rag_system():
-    """Create a mock RAG system for API testing"""
-    mock_rag = Mock()
+@pytest.fixture(scope="session")
+def shared_embedding_function():
+    """Load the sentence transformer once for every real VectorStore in a session"""
+    from chromadb.utils.embedding_functions import (
+        SentenceTransformerEmbeddingFunction,
+    )
+
+    return SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+
+
+# Shared read-only analytics payload restored on mock_rag_system after each test
+_DEFAULT_COURSE_STATS = {
+    "total_courses": 2,
+    "course_titles": ["Python Fundamentals", "Web Development"]
+}
+
+
+def _configure_rag_system(mock_rag):
     mock_rag.query.return_value = (
         "This is a test response from the RAG system.",
         [{"course_title": "Test Course", "lesson_number": 1, "content": "Test content"}]
     )
-    mock_rag.get_course_analytics.return_value = {
-        "total_courses": 2,
-        "course_titles": ["Python Fundamentals", "Web Development"]
-    }
+    mock_rag.get_course_analytics.return_value = _DEFAULT_COURSE_STATS
     mock_rag.session_manager.create_session.return_value = "test_session_123"
     mock_rag.session_manager.clear_session.return_value = None
     mock_rag.add_course_folder.return_value = (2, 10)  # courses, chunks
-    return mock_rag
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def mock_rag_system():
+    """Create a mock RAG system for API testing"""
+    yield from _shared_mock(_configure_rag_system)
+
+
+@pytest.fixture(scope="session")
 def test_app(mock_rag_system):
     """Create a test FastAPI app without static file mounting issues"""
     from fastapi import FastAPI, HTTPException
     from fastapi.middleware.cors import CORSMiddleware
     from fastapi.middleware.trustedhost import TrustedHostMiddleware
     from pydantic import BaseModel
+    from starlette.concurrency import run_in_threadpool
     from typing import List, Optional, Dict, Any
     
     # Create test app
@@ -277,7 +403,9 @@ def test_app(mock_rag_system):
             if not session_id:
                 session_id = mock_rag_system.session_manager.create_session()
             
-            answer, sources = mock_rag_system.query(request.query, session_id)
+            answer, sources = await run_in_threadpool(
+                mock_rag_system.query, request.query, session_id
+            )
             
             return QueryResponse(
                 answer=answer,
@@ -290,7 +418,7 @@ def test_app(mock_rag_system):
     @app.get("/api/courses", response_model=CourseStats)
     async def get_course_stats():
         try:
-            analytics = mock_rag_system.get_course_analytics()
+            analytics = await run_in_threadpool(mock_rag_system.get_course_analytics)
             return CourseStats(
                 total_courses=analytics["total_courses"],
                 course_titles=analytics["course_titles"]
@@ -314,7 +442,19 @@ def test_app(mock_rag_system):
     return app
 
 
-@pytest.fixture
-def test_client(test_app):
+@pytest.fixture(scope="session")
+def test_client(test_app, mock_rag_system):
     """Create a test client for the FastAPI app"""
-    return TestClient(test_app)
+    from fastapi.testclient import TestClient
+
+    # Entering the client starts its event loop portal and the app lifespan
+    # once, instead of once per request
+    with TestClient(test_app) as client:
+        # Hit every route once so routing and validation are warm before the
+        # first test, then forget the calls the warmup made on the mock
+        client.get("/")
+        client.post("/api/query", json={"query": "warmup"})
+        client.get("/api/courses")
+        client.post("/api/reset-session", json={"session_id": "warmup"})
+        mock_rag_system.reset_mock()
+        yield client
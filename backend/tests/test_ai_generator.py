@@ -1,72 +1,48 @@
-from unittest.mock import MagicMock, Mock, patch
+import json
+import threading
+from collections import deque
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
 
+import anthropic
 import pytest
 from ai_generator import AIGenerator
 
+SYSTEM_PROMPT = AIGenerator.SYSTEM_PROMPT
 
-class TestAIGenerator:
-    @pytest.fixture
-    def mock_anthropic_response(self):
-        response = Mock()
-        response.content = [Mock()]
-        response.content[0].text = "Test AI response"
-        response.stop_reason = "end_turn"
-        return response
-
-    @pytest.fixture
-    def mock_tool_use_response(self):
-        response = Mock()
-
-        # Mock content blocks for tool use
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_123"
-        tool_block.input = {"query": "test query"}
-
-        response.content = [tool_block]
-        response.stop_reason = "tool_use"
-        return response
-
-    @pytest.fixture
-    def mock_final_response(self):
-        response = Mock()
-        response.content = [Mock()]
-        response.content[0].text = "Final AI response with tool results"
-        response.stop_reason = "end_turn"
-        return response
-
-    @pytest.fixture
-    def mock_tool_manager(self):
-        manager = Mock()
-        manager.execute_tool.return_value = "Tool execution result"
-        return manager
-
-    @pytest.fixture
-    def ai_generator(self):
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
+# Anthropic rejects requests with more cache_control breakpoints than this
+MAX_CACHE_BREAKPOINTS = 4
 
-            generator = AIGenerator("test_api_key", "claude-3-sonnet-20240229")
-            generator.client = mock_client
-            return generator
 
-    def test_init(self):
-        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
-            mock_client = Mock()
-            mock_anthropic.return_value = mock_client
+def count_cache_breakpoints(call_kwargs):
+    """Count cache_control markers across tools, system and message blocks"""
+    blocks = [*call_kwargs.get("tools", []), *call_kwargs["system"]]
+    for message in call_kwargs["messages"]:
+        if isinstance(message["content"], list):
+            blocks.extend(message["content"])
 
-            generator = AIGenerator("test_api_key", "claude-3-sonnet-20240229")
+    count = sum(
+        1 for block in blocks if isinstance(block, dict) and "cache_control" in block
+    )
+    assert count <= MAX_CACHE_BREAKPOINTS, f"{count} cache breakpoints sent"
+    return count
 
-            mock_anthropic.assert_called_once_with(api_key="test_api_key")
-            assert generator.model == "claude-3-sonnet-20240229"
-            assert generator.base_params["model"] == "claude-3-sonnet-20240229"
-            assert generator.base_params["temperature"] == 0
-            assert generator.base_params["max_tokens"] == 800
 
-    def test_generate_response_simple(self, ai_generator, mock_anthropic_response):
-        ai_generator.client.messages.create.return_value = mock_anthropic_response
+class TestAIGenerator:
+    def test_init(self, shared_generator, patched_anthropic):
+        anthropic.Anthropic.assert_any_call(api_key="test_api_key")
+        assert shared_generator.client is patched_anthropic
+        assert shared_generator.model == "claude-3-sonnet-20240229"
+        assert shared_generator.base_params == {
+            "model": "claude-3-sonnet-20240229",
+            "temperature": 0,
+            "max_tokens": 800,
+        }
+
+    def test_generate_response_simple(self, ai_generator, make_text_response):
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
 
         result = ai_generator.generate_response("What is Python?")
 
@@ -76,15 +52,20 @@ class TestAIGenerator:
         call_args = ai_generator.client.messages.create.call_args
         assert call_args[1]["model"] == "claude-3-sonnet-20240229"
         assert call_args[1]["temperature"] == 0
+        # A stalled connection fails fast instead of at the SDK default
+        assert call_args[1]["timeout"] == ai_generator.stream_idle_timeout
         assert call_args[1]["max_tokens"] == 800
         assert call_args[1]["messages"][0]["content"] == "What is Python?"
         assert call_args[1]["messages"][0]["role"] == "user"
-        assert AIGenerator.SYSTEM_PROMPT in call_args[1]["system"]
-
-    def test_generate_response_with_history(
-        self, ai_generator, mock_anthropic_response
-    ):
-        ai_generator.client.messages.create.return_value = mock_anthropic_response
+        system_blocks = call_args[1]["system"]
+        assert system_blocks[0]["text"] == SYSTEM_PROMPT
+        assert system_blocks[0]["cache_control"] == {"type": "ephemeral"}
+        assert count_cache_breakpoints(call_args[1]) == 1
+
+    def test_generate_response_with_history(self, ai_generator, make_text_response):
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
         history = "Previous conversation content"
 
         result = ai_generator.generate_response(
@@ -93,37 +74,51 @@ class TestAIGenerator:
 
         assert result == "Test AI response"
 
-        # Verify history is included in system prompt
+        # Verify history is a separate block after the cached system prompt
         call_args = ai_generator.client.messages.create.call_args
-        system_content = call_args[1]["system"]
-        assert "Previous conversation content" in system_content
-        assert AIGenerator.SYSTEM_PROMPT in system_content
-
-    def test_generate_response_with_tools(self, ai_generator, mock_anthropic_response):
-        ai_generator.client.messages.create.return_value = mock_anthropic_response
+        system_blocks = call_args[1]["system"]
+        assert len(system_blocks) == 2
+        assert system_blocks[0]["text"] == SYSTEM_PROMPT
+        assert "Previous conversation content" in system_blocks[1]["text"]
+        assert system_blocks[1]["cache_control"] == {"type": "ephemeral"}
+        assert count_cache_breakpoints(call_args[1]) == 2
+
+    def test_generate_response_with_tools(self, ai_generator, make_text_response):
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
         tools = [{"name": "test_tool", "description": "A test tool"}]
 
         result = ai_generator.generate_response("What is Python?", tools=tools)
 
         assert result == "Test AI response"
 
-        # Verify tools are included
+        # Verify tools are included with a cache breakpoint on the last one
         call_args = ai_generator.client.messages.create.call_args
-        assert call_args[1]["tools"] == tools
+        assert call_args[1]["tools"] == [
+            {**tools[0], "cache_control": {"type": "ephemeral"}}
+        ]
         assert call_args[1]["tool_choice"] == {"type": "auto"}
+        assert count_cache_breakpoints(call_args[1]) == 2
+
+        # Caller's tool definitions must not be mutated
+        assert "cache_control" not in tools[0]
 
     def test_generate_response_with_tool_use(
-        self,
-        ai_generator,
-        mock_tool_use_response,
-        mock_final_response,
-        mock_tool_manager,
+        self, ai_generator, make_tool_response, make_text_response, mock_tool_manager
     ):
         # First call returns tool use, second call returns final response
-        ai_generator.client.messages.create.side_effect = [
-            mock_tool_use_response,
-            mock_final_response,
-        ]
+        responses = deque(
+            [
+                make_tool_response(
+                    "search_course_content", "tool_123", {"query": "test query"}
+                ),
+                make_text_response("Final AI response with tool results"),
+            ]
+        )
+        ai_generator.client.messages.create.side_effect = (
+            lambda **kwargs: responses.popleft()
+        )
 
         tools = [{"name": "search_course_content", "description": "Search tool"}]
 
@@ -141,27 +136,24 @@ class TestAIGenerator:
         # Verify two API calls were made
         assert ai_generator.client.messages.create.call_count == 2
 
-    def test_handle_tool_execution(
-        self,
-        ai_generator,
-        mock_tool_use_response,
-        mock_final_response,
-        mock_tool_manager,
+    def test_execute_tools_then_final_response(
+        self, ai_generator, make_tool_response, make_text_response, mock_tool_manager
     ):
-        # Mock the base parameters
-        base_params = {
-            "model": "claude-3-sonnet-20240229",
-            "temperature": 0,
-            "max_tokens": 800,
-            "messages": [{"role": "user", "content": "What is Python?"}],
-            "system": "System prompt content",
-        }
+        messages = [{"role": "user", "content": "What is Python?"}]
+        system_content = ai_generator._build_system(None)
 
-        ai_generator.client.messages.create.return_value = mock_final_response
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Final AI response with tool results"
+        )
 
-        result = ai_generator._handle_tool_execution(
-            mock_tool_use_response, base_params, mock_tool_manager
+        messages, _ = ai_generator._execute_tools_for_round(
+            make_tool_response(
+                "search_course_content", "tool_123", {"query": "test query"}
+            ),
+            messages,
+            mock_tool_manager,
         )
+        result = ai_generator._make_final_response(messages, system_content)
 
         assert result == "Final AI response with tool results"
 
@@ -187,28 +179,38 @@ class TestAIGenerator:
         assert tool_results[0]["tool_use_id"] == "tool_123"
         assert tool_results[0]["content"] == "Tool execution result"
 
+        # Prefix up to the newest tool result is cacheable, as is the system prompt
+        assert tool_results[-1]["cache_control"] == {"type": "ephemeral"}
+        assert call_args[1]["system"][0]["cache_control"] == {"type": "ephemeral"}
+
     def test_system_prompt_content(self):
         # Test that the system prompt contains expected instructions
-        system_prompt = AIGenerator.SYSTEM_PROMPT
+        system_prompt = SYSTEM_PROMPT.lower()
+        expected_phrases = [
+            "course materials",
+            "tool usage",
+            "content search tool",
+            "course outline tool",
+            "up to 2 tool usage rounds",
+            "one tool use per round maximum",
+            "brief, concise and focused",
+        ]
 
-        assert "course materials" in system_prompt.lower()
-        assert "tool usage" in system_prompt.lower()
-        assert "content search tool" in system_prompt.lower()
-        assert "course outline tool" in system_prompt.lower()
-        assert "up to 2 tool usage rounds" in system_prompt.lower()
-        assert "one tool use per round maximum" in system_prompt.lower()
-        assert "brief, concise and focused" in system_prompt.lower()
+        missing = [phrase for phrase in expected_phrases if phrase not in system_prompt]
+        assert missing == []
 
     def test_generate_response_no_tool_manager_with_tool_use(
-        self, ai_generator, mock_tool_use_response
+        self, ai_generator, make_tool_response
     ):
         # If tool_manager is None but response requires tool use, should handle gracefully
-        ai_generator.client.messages.create.return_value = mock_tool_use_response
+        ai_generator.client.messages.create.return_value = make_tool_response(
+            "search_course_content", "tool_123", {"query": "test query"}
+        )
 
         tools = [{"name": "test_tool", "description": "A test tool"}]
 
         # This should not raise an exception, but behavior depends on implementation
-        # Since _handle_tool_execution is only called when tool_manager exists,
+        # Since tools are only executed when a tool_manager exists,
         # this would likely return the raw response content
         result = ai_generator.generate_response("What is Python?", tools=tools)
 
@@ -216,169 +218,156 @@ class TestAIGenerator:
         # This test ensures the method doesn't crash
         assert result is not None
 
-    def test_sequential_tool_calling_two_rounds(self, ai_generator, mock_tool_manager):
-        # Mock responses for 2-round tool calling
-        first_tool_response = Mock()
-        first_tool_block = Mock()
-        first_tool_block.type = "tool_use"
-        first_tool_block.name = "search_course_content"
-        first_tool_block.id = "tool_123"
-        first_tool_block.input = {"query": "first search"}
-        first_tool_response.content = [first_tool_block]
-        first_tool_response.stop_reason = "tool_use"
-
-        second_tool_response = Mock()
-        second_tool_block = Mock()
-        second_tool_block.type = "tool_use"
-        second_tool_block.name = "search_course_outline"
-        second_tool_block.id = "tool_456"
-        second_tool_block.input = {"course_name": "follow-up search"}
-        second_tool_response.content = [second_tool_block]
-        second_tool_response.stop_reason = "tool_use"
-
-        final_response = Mock()
-        final_response.content = [Mock()]
-        final_response.content[0].text = "Final synthesized response"
-        final_response.stop_reason = "end_turn"
-
-        # Configure side effects: first round tool use, second round tool use, final response
-        ai_generator.client.messages.create.side_effect = [
-            first_tool_response,
-            second_tool_response,
-            final_response,
+    @pytest.mark.parametrize(
+        "tool_rounds,max_rounds,expected_api_calls",
+        [
+            (1, 2, 2),  # Answers after the first tool round
+            (2, 2, 3),  # Uses both rounds, then a final answer is forced
+            (1, 1, 2),  # Single allowed round, then a final answer is forced
+        ],
+    )
+    def test_sequential_tool_flow(
+        self,
+        ai_generator,
+        mock_tool_manager,
+        make_tool_response,
+        make_text_response,
+        tool_rounds,
+        max_rounds,
+        expected_api_calls,
+    ):
+        tool_responses = [
+            make_tool_response(
+                "search_course_content", f"tool_{i}", {"query": f"search {i}"}
+            )
+            for i in range(tool_rounds)
         ]
+        responses = deque(
+            tool_responses + [make_text_response("Final synthesized response")]
+        )
+
+        # The live messages list keeps growing, so record its shape per call
+        shapes = []
+
+        def create(**kwargs):
+            shapes.append(tuple(message["role"] for message in kwargs["messages"]))
+            return responses.popleft()
 
-        # Configure tool manager to return different results for each call
+        ai_generator.client.messages.create.side_effect = create
         mock_tool_manager.execute_tool.side_effect = [
-            "First tool result",
-            "Second tool result",
+            f"Tool result {i}" for i in range(tool_rounds)
         ]
 
-        tools = [
-            {"name": "search_course_content", "description": "Search content"},
-            {"name": "search_course_outline", "description": "Search outline"},
-        ]
+        tools = [{"name": "search_course_content", "description": "Search content"}]
 
         result = ai_generator.generate_response(
-            "Complex query requiring two searches",
+            "Query that needs course searches",
             tools=tools,
             tool_manager=mock_tool_manager,
+            max_rounds=max_rounds,
         )
 
         assert result == "Final synthesized response"
 
-        # Verify two tool executions occurred
-        assert mock_tool_manager.execute_tool.call_count == 2
-        mock_tool_manager.execute_tool.assert_any_call(
-            "search_course_content", query="first search"
-        )
-        mock_tool_manager.execute_tool.assert_any_call(
-            "search_course_outline", course_name="follow-up search"
-        )
-
-        # Verify three API calls were made (2 rounds + final)
-        assert ai_generator.client.messages.create.call_count == 3
-
-    def test_early_termination_after_first_round(self, ai_generator, mock_tool_manager):
-        # First call uses tool, second call provides final answer without tool use
-        first_tool_response = Mock()
-        first_tool_block = Mock()
-        first_tool_block.type = "tool_use"
-        first_tool_block.name = "search_course_content"
-        first_tool_block.id = "tool_123"
-        first_tool_block.input = {"query": "test query"}
-        first_tool_response.content = [first_tool_block]
-        first_tool_response.stop_reason = "tool_use"
-
-        second_response = Mock()
-        second_response.content = [Mock()]
-        second_response.content[0].text = "Final answer after first round"
-        second_response.stop_reason = "end_turn"
-
-        ai_generator.client.messages.create.side_effect = [
-            first_tool_response,
-            second_response,
+        # One tool execution per tool round
+        assert mock_tool_manager.execute_tool.call_count == tool_rounds
+        for i in range(tool_rounds):
+            mock_tool_manager.execute_tool.assert_any_call(
+                "search_course_content", query=f"search {i}"
+            )
+
+        # Each round adds the assistant tool use and the user tool results
+        assert shapes == [
+            ("user",) + ("assistant", "user") * round_number
+            for round_number in range(expected_api_calls)
         ]
-        mock_tool_manager.execute_tool.return_value = "Tool result"
 
-        tools = [{"name": "search_course_content", "description": "Search tool"}]
-
-        result = ai_generator.generate_response(
-            "Query that only needs one tool call",
-            tools=tools,
-            tool_manager=mock_tool_manager,
-        )
-
-        assert result == "Final answer after first round"
-
-        # Verify only one tool execution
-        assert mock_tool_manager.execute_tool.call_count == 1
-
-        # Verify two API calls (first round + final answer)
-        assert ai_generator.client.messages.create.call_count == 2
-
-    def test_max_rounds_exceeded(self, ai_generator, mock_tool_manager):
-        # Both rounds use tools, then force final response
-        tool_response = Mock()
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_123"
-        tool_block.input = {"query": "test query"}
-        tool_response.content = [tool_block]
-        tool_response.stop_reason = "tool_use"
-
-        final_response = Mock()
-        final_response.content = [Mock()]
-        final_response.content[0].text = "Final response after max rounds"
-        final_response.stop_reason = "end_turn"
-
-        # First two calls return tool use, third is final response
-        ai_generator.client.messages.create.side_effect = [
-            tool_response,
-            tool_response,
-            final_response,
+        # Only the newest tool result carries the message cache breakpoint
+        final_call = ai_generator.client.messages.create.call_args[1]
+        tool_result_messages = final_call["messages"][2::2]
+        assert len(tool_result_messages) == tool_rounds
+        for message in tool_result_messages[:-1]:
+            assert "cache_control" not in message["content"][-1]
+        assert tool_result_messages[-1]["content"][-1]["cache_control"] == {
+            "type": "ephemeral"
+        }
+        # Tools, system prompt and newest tool result
+        assert count_cache_breakpoints(final_call) == 3
+
+        # Every round serializes the tools to the same bytes, key order included,
+        # so the cached prefix holds even though the list is rebuilt per call
+        tools_sent = [
+            json.dumps(call[1]["tools"]).encode()
+            for call in ai_generator.client.messages.create.call_args_list
         ]
+        assert len(set(tools_sent)) == 1
 
-        mock_tool_manager.execute_tool.return_value = "Tool result"
+        # Tool use is only disabled when the final answer is forced
+        if tool_rounds == max_rounds:
+            assert final_call["tool_choice"] == {"type": "none"}
+        else:
+            assert final_call["tool_choice"] == {"type": "auto"}
 
-        tools = [{"name": "search_course_content", "description": "Search tool"}]
-
-        result = ai_generator.generate_response(
-            "Query that wants to use tools repeatedly",
-            tools=tools,
+    @pytest.mark.parametrize("history_kind", ["string", "messages"])
+    def test_cache_breakpoints_stay_within_limit(
+        self,
+        ai_generator,
+        mock_tool_manager,
+        make_tool_response,
+        make_text_response,
+        history_kind,
+    ):
+        responses = deque(
+            [
+                make_tool_response("search_course_content", "tool_1", {"query": "a"}),
+                make_tool_response("search_course_content", "tool_2", {"query": "b"}),
+                make_text_response("Final answer"),
+            ]
+        )
+        ai_generator.client.messages.create.side_effect = (
+            lambda **kwargs: responses.popleft()
+        )
+        history = {
+            "string": {"conversation_history": "User: Hi\nAssistant: Hello"},
+            "messages": {
+                "history_messages": [
+                    {"role": "user", "content": "Hi"},
+                    {"role": "assistant", "content": "Hello"},
+                ]
+            },
+        }[history_kind]
+
+        ai_generator.generate_response(
+            "Query",
+            tools=[{"name": "search_course_content"}],
             tool_manager=mock_tool_manager,
-            max_rounds=2,
+            **history,
         )
 
-        assert result == "Final response after max rounds"
+        # Checked against the final call, which carries the longest prefix
+        final_call = ai_generator.client.messages.create.call_args[1]
+        assert count_cache_breakpoints(final_call) == MAX_CACHE_BREAKPOINTS
 
-        # Verify two tool executions (max rounds)
-        assert mock_tool_manager.execute_tool.call_count == 2
+        # The history prefix keeps its breakpoint through every tool round
+        if history_kind == "string":
+            history_block = final_call["system"][-1]
+        else:
+            history_block = final_call["messages"][1]["content"][-1]
+        assert history_block["cache_control"] == {"type": "ephemeral"}
 
-        # Verify three API calls (2 rounds + final)
-        assert ai_generator.client.messages.create.call_count == 3
-
-    def test_conversation_state_maintenance(self, ai_generator, mock_tool_manager):
+    def test_conversation_state_maintenance(
+        self, ai_generator, mock_tool_manager, make_tool_response, make_text_response
+    ):
         # Test that conversation state is properly maintained across rounds
-        first_tool_response = Mock()
-        first_tool_block = Mock()
-        first_tool_block.type = "tool_use"
-        first_tool_block.name = "search_course_content"
-        first_tool_block.id = "tool_123"
-        first_tool_block.input = {"query": "first search"}
-        first_tool_response.content = [first_tool_block]
-        first_tool_response.stop_reason = "tool_use"
-
-        final_response = Mock()
-        final_response.content = [Mock()]
-        final_response.content[0].text = "Response with context"
-        final_response.stop_reason = "end_turn"
-
-        ai_generator.client.messages.create.side_effect = [
-            first_tool_response,
-            final_response,
-        ]
+        first_tool_response = make_tool_response(
+            "search_course_content", "tool_123", {"query": "first search"}
+        )
+        final_response = make_text_response("Response with context")
+
+        responses = deque([first_tool_response, final_response])
+        ai_generator.client.messages.create.side_effect = (
+            lambda **kwargs: responses.popleft()
+        )
         mock_tool_manager.execute_tool.return_value = "Tool result"
 
         tools = [{"name": "search_course_content", "description": "Search tool"}]
@@ -405,12 +394,240 @@ class TestAIGenerator:
         assert tool_results[0]["type"] == "tool_result"
         assert tool_results[0]["tool_use_id"] == "tool_123"
         assert tool_results[0]["content"] == "Tool result"
+        assert tool_results[0]["cache_control"] == {"type": "ephemeral"}
+
+        # Every round reuses the cached system prompt block
+        for call in ai_generator.client.messages.create.call_args_list:
+            assert call[1]["system"][0]["cache_control"] == {"type": "ephemeral"}
 
-    def test_no_tools_direct_response(self, ai_generator, mock_anthropic_response):
+    def test_no_tools_direct_response(self, ai_generator, make_text_response):
         # Test that queries without tools work as before
-        ai_generator.client.messages.create.return_value = mock_anthropic_response
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
 
         result = ai_generator.generate_response("What is Python?")
 
         assert result == "Test AI response"
         assert ai_generator.client.messages.create.call_count == 1
+
+    def test_batch_responses_keep_query_order(self, ai_generator):
+        # Both requests must be in flight at once to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def create(**kwargs):
+            barrier.wait()
+            response = Mock()
+            response.content = [Mock()]
+            response.content[0].text = f"Answer to {kwargs['messages'][0]['content']}"
+            response.stop_reason = "end_turn"
+            return response
+
+        ai_generator.client.messages.create.side_effect = create
+
+        results = ai_generator.generate_responses_batch(
+            ["What is Python?", "What is Rust?"]
+        )
+
+        assert results == ["Answer to What is Python?", "Answer to What is Rust?"]
+
+    def test_batch_with_single_worker_runs_serially(
+        self, ai_generator, make_text_response
+    ):
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
+
+        results = ai_generator.generate_responses_batch(
+            ["Question 1", "Question 2"], max_workers=1
+        )
+
+        assert results == ["Test AI response", "Test AI response"]
+        assert ai_generator.client.messages.create.call_count == 2
+
+    def test_only_tool_use_blocks_are_executed(self, ai_generator, mock_tool_manager):
+        response = SimpleNamespace(
+            content=[
+                SimpleNamespace(text="Let me search for that."),
+                SimpleNamespace(
+                    type="tool_use",
+                    name="search_course_content",
+                    id="tool_123",
+                    input={"query": "test query"},
+                ),
+            ],
+            stop_reason="tool_use",
+        )
+
+        messages, tool_results = ai_generator._execute_tools_for_round(
+            response, [{"role": "user", "content": "Question"}], mock_tool_manager
+        )
+
+        mock_tool_manager.execute_tool.assert_called_once_with(
+            "search_course_content", query="test query"
+        )
+        assert [r["tool_use_id"] for r in tool_results] == ["tool_123"]
+
+    def test_tool_rounds_reuse_the_same_messages_list(
+        self, ai_generator, make_tool_response, make_text_response, mock_tool_manager
+    ):
+        responses = deque(
+            [
+                make_tool_response(
+                    "search_course_content", "tool_123", {"query": "test query"}
+                ),
+                make_text_response("Final AI response with tool results"),
+            ]
+        )
+        ai_generator.client.messages.create.side_effect = (
+            lambda **kwargs: responses.popleft()
+        )
+
+        ai_generator.generate_response(
+            "What is Python?",
+            tools=[{"name": "search_course_content"}],
+            tool_manager=mock_tool_manager,
+        )
+
+        first_call, second_call = ai_generator.client.messages.create.call_args_list
+        assert first_call[1]["messages"] is second_call[1]["messages"]
+
+    def test_short_history_is_kept_verbatim(self, ai_generator):
+        history = "User: Hi\nAssistant: Hello"
+
+        assert ai_generator._compact_history(history) == history
+
+    def test_long_history_keeps_most_recent_turns(self, ai_generator):
+        ai_generator.history_max_tokens = 12  # ~48 characters
+        history = (
+            "User: First question\nAssistant: First answer\n"
+            "User: Second question\nAssistant: Second\nanswer"
+        )
+
+        compacted = ai_generator._compact_history(history)
+
+        assert compacted == (
+            "[Earlier turns omitted]\nUser: Second question\nAssistant: Second\nanswer"
+        )
+
+    def test_oversized_newest_turn_is_truncated(self, ai_generator):
+        ai_generator.history_max_tokens = 5  # ~20 characters
+        history = "User: Hi\nAssistant: " + "x" * 100
+
+        compacted = ai_generator._compact_history(history)
+
+        assert compacted == "[Earlier turns omitted]\nAssistant: xxxxxxxxx"
+
+    def test_system_prompt_uses_compacted_history(
+        self, ai_generator, make_text_response
+    ):
+        ai_generator.history_max_tokens = 10
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
+        history = "User: " + "old " * 50 + "\nUser: Latest question"
+
+        ai_generator.generate_response("What is Python?", conversation_history=history)
+
+        system = ai_generator.client.messages.create.call_args[1]["system"]
+        assert system[1]["text"] == (
+            "Previous conversation:\n[Earlier turns omitted]\nUser: Latest question"
+        )
+
+    def test_generators_share_client_per_api_key(self):
+        with patch("ai_generator.anthropic.Anthropic") as mock_anthropic:
+            mock_anthropic.side_effect = lambda api_key: Mock(api_key=api_key)
+
+            first = AIGenerator("key_a", "claude-3-sonnet-20240229")
+            second = AIGenerator("key_a", "claude-3-sonnet-20240229")
+            other = AIGenerator("key_b", "claude-3-sonnet-20240229")
+
+        assert first.client is second.client
+        assert other.client is not first.client
+        assert mock_anthropic.call_count == 2
+
+    def test_history_messages_are_sent_before_query(
+        self, ai_generator, make_text_response
+    ):
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
+        history = [
+            {"role": "user", "content": "What is Python?"},
+            {"role": "assistant", "content": "A programming language."},
+        ]
+
+        ai_generator.generate_response("Who created it?", history_messages=history)
+
+        call_args = ai_generator.client.messages.create.call_args[1]
+        assert call_args["messages"] == [
+            {"role": "user", "content": "What is Python?"},
+            {
+                "role": "assistant",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "A programming language.",
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
+            },
+            {"role": "user", "content": "Who created it?"},
+        ]
+        # History travels as messages, so the system prompt stays static
+        assert call_args["system"] == ai_generator._system_blocks
+        # The caller's history is left untouched
+        assert history[1] == {"role": "assistant", "content": "A programming language."}
+
+    def test_tool_use_without_manager_returns_leading_text(self, ai_generator):
+        ai_generator.client.messages.create.return_value = SimpleNamespace(
+            content=[
+                SimpleNamespace(type="text", text="Python is a language."),
+                SimpleNamespace(type="tool_use", name="search", id="t1", input={}),
+            ],
+            stop_reason="tool_use",
+        )
+
+        result = ai_generator.generate_response(
+            "What is Python?", tools=[{"name": "search"}]
+        )
+
+        assert result == "Python is a language."
+
+    def test_response_cache_hit_ignores_surrounding_whitespace(
+        self, ai_generator, make_text_response
+    ):
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
+
+        first = ai_generator.generate_response("What is Python?")
+        second = ai_generator.generate_response("  What is Python? \n")
+
+        assert first == second == "Test AI response"
+        assert ai_generator.client.messages.create.call_count == 1
+
+    def test_response_cache_keeps_inner_indentation(
+        self, ai_generator, make_text_response
+    ):
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
+
+        # Same YAML except for indentation width, which changes the nesting
+        ai_generator.generate_response("Is this valid?\na:\n  b:\n    c: 1")
+        ai_generator.generate_response("Is this valid?\na:\n  b:\n  c: 1")
+
+        assert ai_generator.client.messages.create.call_count == 2
+
+    def test_query_sent_as_typed(self, ai_generator, make_text_response):
+        ai_generator.client.messages.create.return_value = make_text_response(
+            "Test AI response"
+        )
+        query = "Why does this fail?\n    for x in  xs:\n\tprint(x)"
+
+        ai_generator.generate_response(query)
+
+        # Whitespace is only normalized for the cache key, never in the prompt
+        call_args = ai_generator.client.messages.create.call_args[1]
+        assert call_args["messages"] == [{"role": "user", "content": query}]
@@ -0,0 +1,166 @@
+from unittest.mock import Mock
+
+import pytest
+from ai_generator import AIGenerator
+from ai_generator_cache import SemanticCache
+
+
+class TestSemanticCache:
+    def test_lookup_on_empty_cache(self):
+        cache = SemanticCache()
+
+        assert cache.lookup([1.0, 0.0]) is None
+
+    def test_similar_embedding_hits(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.0], "Python answer")
+
+        assert cache.lookup([0.99, 0.05, 0.0]) == "Python answer"
+
+    def test_dissimilar_embedding_misses(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.0], "Python answer")
+
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+
+    def test_returns_most_similar_answer(self):
+        cache = SemanticCache(threshold=0.5)
+        cache.add([1.0, 0.0], "first")
+        cache.add([0.6, 0.8], "second")
+
+        assert cache.lookup([0.5, 0.9]) == "second"
+
+    def test_overwrites_oldest_when_full(self):
+        cache = SemanticCache(threshold=0.99, max_size=2)
+        cache.add([1.0, 0.0, 0.0], "a")
+        cache.add([0.0, 1.0, 0.0], "b")
+        cache.add([0.0, 0.0, 1.0], "c")
+
+        assert len(cache) == 2
+        assert cache.lookup([1.0, 0.0, 0.0]) is None
+        assert cache.lookup([0.0, 0.0, 1.0]) == "c"
+
+
+class TestAIGeneratorResponseCache:
+    @pytest.fixture
+    def ai_generator(self, patched_anthropic):
+        generator = AIGenerator("test_api_key", "claude-3-sonnet-20240229")
+
+        response = Mock()
+        response.content = [Mock()]
+        response.content[0].text = "Cached answer"
+        response.stop_reason = "end_turn"
+        patched_anthropic.messages.create.return_value = response
+        return generator
+
+    def test_identical_call_served_from_cache(self, ai_generator):
+        first = ai_generator.generate_response("What is Python?")
+        second = ai_generator.generate_response("What is Python?")
+
+        assert first == second == "Cached answer"
+        assert ai_generator.client.messages.create.call_count == 1
+
+    def test_different_query_misses_cache(self, ai_generator):
+        ai_generator.generate_response("What is Python?")
+        ai_generator.generate_response("What is Rust?")
+
+        assert ai_generator.client.messages.create.call_count == 2
+
+    def test_non_deterministic_calls_are_not_cached(self, ai_generator):
+        ai_generator.temperature = 0.7
+
+        ai_generator.generate_response("What is Python?")
+        ai_generator.generate_response("What is Python?")
+
+        assert ai_generator.client.messages.create.call_count == 2
+
+
+class TestAIGeneratorSemanticCache:
+    @pytest.fixture
+    def ai_generator(self, patched_anthropic):
+        # Map each query to a fixed embedding; paraphrases share a direction
+        embeddings = {
+            "What is Python?": [1.0, 0.0],
+            "Tell me about Python": [0.98, 0.05],
+            "What is Rust?": [0.0, 1.0],
+        }
+
+        generator = AIGenerator(
+            "test_api_key",
+            "claude-3-sonnet-20240229",
+            embedding_fn=lambda texts: [embeddings[t] for t in texts],
+        )
+
+        response = Mock()
+        response.content = [Mock()]
+        response.content[0].text = "Python is a programming language"
+        response.stop_reason = "end_turn"
+        patched_anthropic.messages.create.return_value = response
+        return generator
+
+    def test_semantic_cache_disabled_without_embedding_fn(self, patched_anthropic):
+        generator = AIGenerator("test_api_key", "claude-3-sonnet-20240229")
+
+        assert generator.semantic_cache is None
+
+    def test_paraphrase_served_from_cache(self, ai_generator):
+        ai_generator.generate_response("What is Python?")
+        result = ai_generator.generate_response("Tell me about Python")
+
+        assert result == "Python is a programming language"
+        assert ai_generator.client.messages.create.call_count == 1
+
+    def test_unrelated_query_misses(self, ai_generator):
+        ai_generator.generate_response("What is Python?")
+        ai_generator.generate_response("What is Rust?")
+
+        assert ai_generator.client.messages.create.call_count == 2
+
+    def test_cache_query_is_embedded_instead_of_prompt(self, ai_generator):
+        ai_generator.generate_response(
+            "Answer this question: What is Python?", cache_query="What is Python?"
+        )
+        result = ai_generator.generate_response(
+            "Answer this question: Tell me about Python",
+            cache_query="Tell me about Python",
+        )
+
+        assert result == "Python is a programming language"
+        assert ai_generator.client.messages.create.call_count == 1
+
+    def test_clear_semantic_cache(self, ai_generator):
+        ai_generator.generate_response("What is Python?")
+        ai_generator.clear_semantic_cache()
+        ai_generator.generate_response("Tell me about Python")
+
+        assert ai_generator.client.messages.create.call_count == 2
+
+    def test_queries_with_history_bypass_cache(self, ai_generator):
+        ai_generator.generate_response("What is Python?")
+        ai_generator.generate_response(
+            "Tell me about Python", conversation_history="User: Hi\nAssistant: Hi"
+        )
+
+        assert ai_generator.client.messages.create.call_count == 2
+
+    def test_tool_failures_are_not_cached(self, ai_generator, mock_tool_manager):
+        tool_block = Mock()
+        tool_block.type = "tool_use"
+        tool_block.name = "search_course_content"
+        tool_block.id = "tool_123"
+        tool_block.input = {"query": "Python"}
+        tool_response = Mock()
+        tool_response.content = [tool_block]
+        tool_response.stop_reason = "tool_use"
+        ai_generator.client.messages.create.return_value = tool_response
+
+        mock_tool_manager.execute_tool.side_effect = Exception("Search failed")
+
+        result = ai_generator.generate_response(
+            "What is Python?",
+            tools=[{"name": "search_course_content"}],
+            tool_manager=mock_tool_manager,
+        )
+
+        assert result.startswith("Tool execution failed")
+        assert len(ai_generator.semantic_cache) == 0
@@ -0,0 +1,237 @@
+"""
+AIGenerator tests that run through the real Anthropic SDK request path.
+
+Responses are served by an in-process httpx.MockTransport, so request
+serialization and response parsing are exercised without any network access.
+"""
+
+import json
+from pathlib import Path
+from unittest.mock import call
+
+import anthropic
+import httpx
+import pytest
+from ai_generator import AIGenerator
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def message_body(content, stop_reason="end_turn"):
+    return {
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-sonnet-4-20250514",
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    }
+
+
+def sse_body(text_chunks):
+    start = message_body([], stop_reason=None)
+    events = [
+        ("message_start", {"type": "message_start", "message": start}),
+        (
+            "content_block_start",
+            {
+                "type": "content_block_start",
+                "index": 0,
+                "content_block": {"type": "text", "text": ""},
+            },
+        ),
+    ]
+    for chunk in text_chunks:
+        events.append(
+            (
+                "content_block_delta",
+                {
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": chunk},
+                },
+            )
+        )
+    events += [
+        ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        (
+            "message_delta",
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": len(text_chunks)},
+            },
+        ),
+        ("message_stop", {"type": "message_stop"}),
+    ]
+    return "".join(
+        f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events
+    )
+
+
+class FakeAnthropicServer:
+    """Serves queued responses and records the JSON payload of each request"""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+
+    def add_message(self, content, stop_reason="end_turn"):
+        self.responses.append(
+            httpx.Response(200, json=message_body(content, stop_reason))
+        )
+
+    def add_stream(self, text_chunks):
+        self.responses.append(
+            httpx.Response(
+                200,
+                text=sse_body(text_chunks),
+                headers={"content-type": "text/event-stream"},
+            )
+        )
+
+    def add_cassette(self, name):
+        """Queue every message stored in a JSON fixture file"""
+        for body in json.loads((FIXTURES_DIR / name).read_text()):
+            self.responses.append(httpx.Response(200, json=body))
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(json.loads(request.content))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def server():
+    return FakeAnthropicServer()
+
+
+@pytest.fixture
+def ai_generator(server):
+    generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
+    generator.client = anthropic.Anthropic(
+        api_key="test_api_key",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(server.handle)),
+    )
+    return generator
+
+
+class TestAIGeneratorOverHTTP:
+    def test_text_response(self, ai_generator, server):
+        server.add_message([{"type": "text", "text": "Python is a language."}])
+
+        result = ai_generator.generate_response("What is Python?")
+
+        assert result == "Python is a language."
+        payload = server.requests[0]
+        assert payload["messages"] == [{"role": "user", "content": "What is Python?"}]
+        assert payload["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert payload["temperature"] == 0
+
+    def test_tool_round_payloads(self, ai_generator, server, mock_tool_manager):
+        server.add_message(
+            [
+                {
+                    "type": "tool_use",
+                    "id": "toolu_1",
+                    "name": "search_course_content",
+                    "input": {"query": "Python basics"},
+                }
+            ],
+            stop_reason="tool_use",
+        )
+        server.add_message([{"type": "text", "text": "Lesson 1 covers basics."}])
+
+        mock_tool_manager.execute_tool.side_effect = (
+            lambda name, **kwargs: f"{name}: {kwargs['query']}"
+        )
+
+        tools = [
+            {
+                "name": "search_course_content",
+                "description": "Search course materials",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {"query": {"type": "string"}},
+                    "required": ["query"],
+                },
+            }
+        ]
+
+        result = ai_generator.generate_response(
+            "What does lesson 1 cover?",
+            tools=tools,
+            tool_manager=mock_tool_manager,
+            max_rounds=1,
+        )
+
+        assert result == "Lesson 1 covers basics."
+        first, final = server.requests
+        assert first["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert first["tool_choice"] == {"type": "auto"}
+
+        # The SDK content blocks are sent back as plain JSON
+        assert final["messages"][1] == {
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "tool_use",
+                    "id": "toolu_1",
+                    "name": "search_course_content",
+                    "input": {"query": "Python basics"},
+                }
+            ],
+        }
+        assert final["messages"][2]["content"] == [
+            {
+                "type": "tool_result",
+                "tool_use_id": "toolu_1",
+                "content": "search_course_content: Python basics",
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+        assert final["tool_choice"] == {"type": "none"}
+
+    def test_streamed_response(self, ai_generator, server):
+        server.add_stream(["Python ", "is great"])
+
+        chunks = list(ai_generator.stream_response("What is Python?"))
+
+        assert chunks == ["Python ", "is great"]
+        assert server.requests[0]["stream"] is True
+
+    def test_replays_two_round_cassette(self, ai_generator, server, mock_tool_manager):
+        server.add_cassette("two_round_tool_use.json")
+        mock_tool_manager.execute_tool.side_effect = lambda name, **kwargs: (
+            f"{name} result"
+        )
+
+        result = ai_generator.generate_response(
+            "What does lesson 4 of the MCP course cover?",
+            tools=[{"name": "get_course_outline"}, {"name": "search_course_content"}],
+            tool_manager=mock_tool_manager,
+        )
+
+        assert result == (
+            "Lesson 4 of the MCP course covers building an MCP client in Python."
+        )
+        assert mock_tool_manager.execute_tool.call_args_list == [
+            call("get_course_outline", course_name="MCP"),
+            call(
+                "search_course_content",
+                query="lesson 4 topics",
+                course_name="MCP",
+                lesson_number=4,
+            ),
+        ]
+        shapes = [
+            [message["role"] for message in payload["messages"]]
+            for payload in server.requests
+        ]
+        assert shapes == [
+            ["user"],
+            ["user", "assistant", "user"],
+            ["user", "assistant", "user", "assistant", "user"],
+        ]
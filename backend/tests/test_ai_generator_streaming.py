@@ -0,0 +1,163 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+
+class FakeStream:
+    """Stand-in for the SDK MessageStream context manager"""
+
+    def __init__(self, events, final_message):
+        self.events = events
+        self.final_message = final_message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def get_final_message(self):
+        return self.final_message
+
+
+def text_event(text):
+    event = Mock()
+    event.type = "text"
+    event.text = text
+    return event
+
+
+def text_message(text):
+    block = Mock()
+    block.type = "text"
+    block.text = text
+    message = Mock()
+    message.content = [block]
+    message.stop_reason = "end_turn"
+    return message
+
+
+def tool_use_message():
+    block = Mock()
+    block.type = "tool_use"
+    block.name = "search_course_content"
+    block.id = "tool_123"
+    block.input = {"query": "Python"}
+    message = Mock()
+    message.content = [block]
+    message.stop_reason = "tool_use"
+    return message
+
+
+class TestStreamResponse:
+    def test_yields_text_chunks(self, ai_generator):
+        ai_generator.client.messages.stream.return_value = FakeStream(
+            [text_event("Python "), text_event("is great")],
+            text_message("Python is great"),
+        )
+
+        chunks = list(ai_generator.stream_response("What is Python?"))
+
+        assert chunks == ["Python ", "is great"]
+        call_args = ai_generator.client.messages.stream.call_args[1]
+        assert call_args["timeout"] == ai_generator.stream_idle_timeout
+        assert call_args["messages"] == [{"role": "user", "content": "What is Python?"}]
+
+    def test_ignores_non_text_events(self, ai_generator):
+        ping = Mock()
+        ping.type = "ping"
+        block_stop = Mock()
+        block_stop.type = "content_block_stop"
+        ai_generator.client.messages.stream.return_value = FakeStream(
+            [ping, text_event("Answer"), block_stop], text_message("Answer")
+        )
+
+        assert list(ai_generator.stream_response("Question")) == ["Answer"]
+
+    def test_tool_round_then_streamed_answer(self, ai_generator, mock_tool_manager):
+        ai_generator.client.messages.stream.side_effect = [
+            FakeStream([], tool_use_message()),
+            FakeStream(
+                [text_event("From the course")], text_message("From the course")
+            ),
+        ]
+        mock_tool_manager.execute_tool.return_value = "Search results"
+
+        chunks = list(
+            ai_generator.stream_response(
+                "What does lesson 1 cover?",
+                tools=[{"name": "search_course_content"}],
+                tool_manager=mock_tool_manager,
+            )
+        )
+
+        assert chunks == ["From the course"]
+        mock_tool_manager.execute_tool.assert_called_once_with(
+            "search_course_content", query="Python"
+        )
+        second_call = ai_generator.client.messages.stream.call_args_list[1][1]
+        assert second_call["messages"][2]["content"][0]["content"] == "Search results"
+
+    def test_final_round_disables_tool_use(self, ai_generator, mock_tool_manager):
+        ai_generator.client.messages.stream.side_effect = [
+            FakeStream([], tool_use_message()),
+            FakeStream([text_event("Done")], text_message("Done")),
+        ]
+        mock_tool_manager.execute_tool.return_value = "Search results"
+
+        chunks = list(
+            ai_generator.stream_response(
+                "Question",
+                tools=[{"name": "search_course_content"}],
+                tool_manager=mock_tool_manager,
+                max_rounds=1,
+            )
+        )
+
+        assert chunks == ["Done"]
+        final_call = ai_generator.client.messages.stream.call_args_list[1][1]
+        assert final_call["tool_choice"] == {"type": "none"}
+
+    def test_tool_failure_yields_error_message(self, ai_generator, mock_tool_manager):
+        ai_generator.client.messages.stream.return_value = FakeStream(
+            [], tool_use_message()
+        )
+        mock_tool_manager.execute_tool.side_effect = Exception("Search failed")
+
+        chunks = list(
+            ai_generator.stream_response(
+                "Question",
+                tools=[{"name": "search_course_content"}],
+                tool_manager=mock_tool_manager,
+            )
+        )
+
+        assert len(chunks) == 1
+        assert chunks[0].startswith("Tool execution failed: Search failed")
+
+    def test_stalled_stream_raises_timeout(self, ai_generator):
+        ai_generator.stream_idle_timeout = 30
+        ai_generator.client.messages.stream.return_value = FakeStream(
+            [text_event("Par"), text_event("tial")], text_message("Partial")
+        )
+
+        # Start, first event, restart after chunk, then a 31 second gap
+        with patch("ai_generator.time.monotonic", side_effect=[0, 1, 1, 32]):
+            stream = ai_generator.stream_response("Question")
+            assert next(stream) == "Par"
+            with pytest.raises(TimeoutError):
+                next(stream)
+
+    def test_repeated_stream_served_from_cache(self, ai_generator):
+        ai_generator.client.messages.stream.return_value = FakeStream(
+            [text_event("Cached answer")], text_message("Cached answer")
+        )
+
+        first = list(ai_generator.stream_response("What is Python?"))
+        second = list(ai_generator.stream_response("What is Python?"))
+
+        assert first == second == ["Cached answer"]
+        assert ai_generator.client.messages.stream.call_count == 1
@@ -3,7 +3,11 @@ Integration tests for FastAPI endpoints in the RAG chatbot system.
 """
 import pytest
 from fastapi import status
-from unittest.mock import Mock, patch
+
+# Preallocated errors raised by the mocked RAG system
+RAG_ERROR = Exception("RAG system error")
+ANALYTICS_ERROR = Exception("Analytics error")
+SESSION_RESET_ERROR = Exception("Session reset error")
 
 
 @pytest.mark.integration
@@ -84,7 +88,7 @@ class TestQueryEndpoint:
 
     def test_query_rag_system_error(self, test_client, mock_rag_system):
         """Test handling of RAG system errors"""
-        mock_rag_system.query.side_effect = Exception("RAG system error")
+        mock_rag_system.query.side_effect = RAG_ERROR
         
         response = test_client.post(
             "/api/query",
@@ -115,7 +119,7 @@ class TestCoursesEndpoint:
 
     def test_get_courses_rag_system_error(self, test_client, mock_rag_system):
         """Test handling of RAG system errors in courses endpoint"""
-        mock_rag_system.get_course_analytics.side_effect = Exception("Analytics error")
+        mock_rag_system.get_course_analytics.side_effect = ANALYTICS_ERROR
         
         response = test_client.get("/api/courses")
         
@@ -168,7 +172,7 @@ class TestResetSessionEndpoint:
 
     def test_reset_session_rag_system_error(self, test_client, mock_rag_system):
         """Test handling of RAG system errors in reset session"""
-        mock_rag_system.session_manager.clear_session.side_effect = Exception("Session reset error")
+        mock_rag_system.session_manager.clear_session.side_effect = SESSION_RESET_ERROR
         
         response = test_client.post(
             "/api/reset-session",
@@ -196,13 +200,7 @@ class TestRootEndpoint:
 class TestCORSAndMiddleware:
     """Test CORS and middleware functionality"""
 
-    def test_cors_headers_present(self, test_client):
-        """Test that CORS headers are present in responses"""
-        response = test_client.get("/")
-        
-        # Check that CORS headers are present (FastAPI adds them automatically with our config)
-        assert response.status_code == status.HTTP_200_OK
-
+    @pytest.mark.smoke
     def test_preflight_request(self, test_client):
         """Test CORS preflight request"""
         response = test_client.options(
@@ -245,55 +243,23 @@ class TestErrorHandling:
 class TestRequestValidation:
     """Test request validation and Pydantic models"""
 
-    def test_query_request_validation(self, test_client):
+    @pytest.mark.parametrize("payload,expected_status", [
+        ({"query": "test"}, status.HTTP_200_OK),  # Valid minimal request
+        ({"query": "test", "session_id": "123"}, status.HTTP_200_OK),  # Valid complete request
+        ({"session_id": "123"}, status.HTTP_422_UNPROCESSABLE_ENTITY),  # Missing required field
+        ({"query": 123}, status.HTTP_422_UNPROCESSABLE_ENTITY),  # Wrong type
+    ])
+    def test_query_request_validation(self, test_client, payload, expected_status):
         """Test query request model validation"""
-        # Valid minimal request
-        response = test_client.post(
-            "/api/query",
-            json={"query": "test"}
-        )
-        assert response.status_code == status.HTTP_200_OK
-
-        # Valid complete request
-        response = test_client.post(
-            "/api/query",
-            json={"query": "test", "session_id": "123"}
-        )
-        assert response.status_code == status.HTTP_200_OK
-
-        # Invalid - missing required field
-        response = test_client.post(
-            "/api/query",
-            json={"session_id": "123"}
-        )
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-
-        # Invalid - wrong type
-        response = test_client.post(
-            "/api/query",
-            json={"query": 123}
-        )
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-
-    def test_reset_session_request_validation(self, test_client):
+        response = test_client.post("/api/query", json=payload)
+        assert response.status_code == expected_status
+
+    @pytest.mark.parametrize("payload,expected_status", [
+        ({"session_id": "test_session"}, status.HTTP_200_OK),  # Valid request
+        ({}, status.HTTP_422_UNPROCESSABLE_ENTITY),  # Missing required field
+        ({"session_id": 123}, status.HTTP_422_UNPROCESSABLE_ENTITY),  # Wrong type
+    ])
+    def test_reset_session_request_validation(self, test_client, payload, expected_status):
         """Test reset session request model validation"""
-        # Valid request
-        response = test_client.post(
-            "/api/reset-session",
-            json={"session_id": "test_session"}
-        )
-        assert response.status_code == status.HTTP_200_OK
-
-        # Invalid - missing required field
-        response = test_client.post(
-            "/api/reset-session",
-            json={}
-        )
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-
-        # Invalid - wrong type
-        response = test_client.post(
-            "/api/reset-session",
-            json={"session_id": 123}
-        )
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
\ No newline at end of file
+        response = test_client.post("/api/reset-session", json=payload)
+        assert response.status_code == expected_status
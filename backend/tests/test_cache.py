@@ -0,0 +1,66 @@
+from unittest.mock import patch
+
+import numpy as np
+from cache import TTLCache
+
+
+class TestTTLCache:
+    def test_get_missing_key_returns_none(self):
+        cache = TTLCache()
+
+        assert cache.get("missing") is None
+
+    def test_set_and_get(self):
+        cache = TTLCache()
+        cache.set("key", "value")
+
+        assert cache.get("key") == "value"
+        assert len(cache) == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        # Touch "a" so "b" becomes the eviction candidate
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_expired_entries_are_dropped(self):
+        cache = TTLCache(ttl_seconds=10)
+
+        with patch("cache.time.monotonic", return_value=100.0):
+            cache.set("key", "value")
+        with patch("cache.time.monotonic", return_value=111.0):
+            assert cache.get("key") is None
+
+        assert len(cache) == 0
+
+    def test_make_key_is_order_independent(self):
+        key1 = TTLCache.make_key({"model": "m", "messages": [], "temperature": 0})
+        key2 = TTLCache.make_key({"temperature": 0, "messages": [], "model": "m"})
+
+        assert key1 == key2
+
+    def test_make_key_differs_for_different_messages(self):
+        key1 = TTLCache.make_key({"messages": [{"role": "user", "content": "a"}]})
+        key2 = TTLCache.make_key({"messages": [{"role": "user", "content": "b"}]})
+
+        assert key1 != key2
+
+    def test_make_key_serializes_numpy_values(self):
+        key1 = TTLCache.make_key({"distances": np.array([0.1, 0.2])})
+        key2 = TTLCache.make_key({"distances": np.array([0.1, 0.3])})
+
+        assert key1 != key2
+
+    def test_make_key_without_orjson_is_order_independent(self):
+        with patch("cache.orjson", None):
+            key1 = TTLCache.make_key({"model": "m", "temperature": 0})
+            key2 = TTLCache.make_key({"temperature": 0, "model": "m"})
+
+        assert key1 == key2
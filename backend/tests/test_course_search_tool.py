@@ -5,17 +5,19 @@ These tests are designed to identify the root cause of "query failed" errors
 by thoroughly testing all aspects of the search tool functionality.
 """
 
-import os
 import sys
-from unittest.mock import Mock, patch
+import threading
+from unittest.mock import Mock
 
 import pytest
-
-# Add backend to path
-backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, backend_dir)
-
-from search_tools import CourseSearchTool, ToolManager
+from cache import TTLCache
+from search_tools import (
+    CourseOutlineTool,
+    CourseSearchTool,
+    SourceList,
+    ToolManager,
+    query_embedding_cache,
+)
 from vector_store import SearchResults
 
 
@@ -163,8 +165,17 @@ class TestCourseSearchToolExecute:
         # This should not raise an exception but return an error message
         result = search_tool.execute("test query")
 
-        # If this raises an exception, it indicates poor error handling
-        assert isinstance(result, str)
+        assert result == "Search error: Exception: ChromaDB connection error"
+        assert len(search_tool.last_sources) == 0
+
+    def test_vector_store_timeout_handling(self, mock_vector_store):
+        """Test that the exception type is reported back to the caller"""
+        mock_vector_store.search.side_effect = TimeoutError("t")
+        search_tool = CourseSearchTool(mock_vector_store)
+
+        result = search_tool.execute("test query")
+
+        assert result == "Search error: TimeoutError: t"
 
     def test_results_formatting_without_lesson_numbers(self, mock_vector_store):
         """Test formatting when metadata lacks lesson numbers"""
@@ -200,13 +211,17 @@ class TestCourseSearchToolExecute:
     def test_lesson_link_retrieval(self, mock_vector_store, successful_search_results):
         """Test that lesson links are retrieved and stored in sources"""
         mock_vector_store.search.return_value = successful_search_results
-        mock_vector_store.get_lesson_link.return_value = "http://example.com/lesson1"
+        mock_vector_store.get_lesson_links.side_effect = lambda pairs: dict.fromkeys(
+            pairs, "http://example.com/lesson1"
+        )
         search_tool = CourseSearchTool(mock_vector_store)
 
         result = search_tool.execute("test query")
 
-        # Verify lesson link was requested
-        mock_vector_store.get_lesson_link.assert_called()
+        # Verify lesson links were requested in a single batch
+        mock_vector_store.get_lesson_links.assert_called_once_with(
+            [("Python Fundamentals", 1), ("Python Fundamentals", 2)]
+        )
 
         # Verify link is stored in sources
         assert len(search_tool.last_sources) > 0
@@ -225,7 +240,7 @@ class TestCourseSearchToolExecute:
         result = search_tool.execute("test query")
 
         # Verify lesson link was NOT requested
-        mock_vector_store.get_lesson_link.assert_not_called()
+        mock_vector_store.get_lesson_links.assert_not_called()
 
         # Verify source has no link
         assert search_tool.last_sources[0]["link"] is None
@@ -291,6 +306,183 @@ class TestCourseSearchToolExecute:
         assert len(search_tool.last_sources) == 3
 
 
+class TestSourceList:
+    """Test the parallel-tuple source container"""
+
+    def test_indexing_yields_source_dicts(self):
+        sources = SourceList(("Course A - Lesson 1", "Course B"), ("http://a", None))
+
+        assert len(sources) == 2
+        assert sources[0] == {"text": "Course A - Lesson 1", "link": "http://a"}
+        assert sources[-1] == {"text": "Course B", "link": None}
+        assert sources[1:] == [{"text": "Course B", "link": None}]
+        assert list(sources) == sources.to_list()
+
+    def test_empty_sources_are_falsy(self):
+        assert not SourceList()
+        assert SourceList().to_list() == []
+
+    def test_smaller_than_list_of_dicts(self):
+        texts = tuple(f"Course {i} - Lesson {i}" for i in range(100))
+        links = tuple(f"http://example.com/{i}" for i in range(100))
+        sources = SourceList(texts, links)
+
+        soa_size = sys.getsizeof(sources.texts) + sys.getsizeof(sources.links)
+        aos = sources.to_list()
+        aos_size = sys.getsizeof(aos) + sum(sys.getsizeof(d) for d in aos)
+        assert soa_size < aos_size
+
+
+class TestCourseSearchToolCache:
+    """Test the optional search result cache"""
+
+    @pytest.fixture
+    def cached_search_tool(self, mock_vector_store):
+        return CourseSearchTool(mock_vector_store, cache=TTLCache())
+
+    def test_repeat_search_served_from_cache(
+        self, cached_search_tool, mock_vector_store, successful_search_results
+    ):
+        mock_vector_store.search.return_value = successful_search_results
+
+        first = cached_search_tool.execute("What is Python?", lesson_number=1)
+        cached_search_tool.last_sources = []
+        second = cached_search_tool.execute("What is Python?", lesson_number=1)
+
+        assert first == second
+        mock_vector_store.search.assert_called_once()
+        assert len(cached_search_tool.last_sources) == 2
+        assert cached_search_tool.last_sources[0]["text"] == (
+            "Python Fundamentals - Lesson 1"
+        )
+
+    def test_different_filters_miss_cache(
+        self, cached_search_tool, mock_vector_store, successful_search_results
+    ):
+        mock_vector_store.search.return_value = successful_search_results
+
+        cached_search_tool.execute("What is Python?")
+        cached_search_tool.execute("What is Python?", course_name="Python")
+
+        assert mock_vector_store.search.call_count == 2
+
+    def test_case_and_spacing_variants_share_entry(
+        self, cached_search_tool, mock_vector_store, successful_search_results
+    ):
+        mock_vector_store.search.return_value = successful_search_results
+
+        cached_search_tool.execute("What is Python?")
+        cached_search_tool.execute("  what  is\tPYTHON? ")
+
+        mock_vector_store.search.assert_called_once()
+        assert mock_vector_store.search.call_args.kwargs["query"] == "What is Python?"
+
+    def test_warmup_populates_cache(
+        self, cached_search_tool, mock_vector_store, successful_search_results
+    ):
+        mock_vector_store.search.return_value = successful_search_results
+        hot_queries = [("What is Python?", None, None), ("Variables", "Python", 2)]
+
+        cached_search_tool.warmup(hot_queries)
+        assert mock_vector_store.search.call_count == 2
+        assert len(cached_search_tool.last_sources) == 0
+
+        for query, course_name, lesson_number in hot_queries:
+            cached_search_tool.execute(
+                query, course_name=course_name, lesson_number=lesson_number
+            )
+        assert mock_vector_store.search.call_count == 2
+
+    def test_errors_are_not_cached(
+        self, cached_search_tool, mock_vector_store, error_search_results
+    ):
+        mock_vector_store.search.return_value = error_search_results
+
+        cached_search_tool.execute("test query")
+        cached_search_tool.execute("test query")
+
+        assert mock_vector_store.search.call_count == 2
+
+    def test_clear_cache(
+        self, cached_search_tool, mock_vector_store, successful_search_results
+    ):
+        mock_vector_store.search.return_value = successful_search_results
+
+        cached_search_tool.execute("What is Python?")
+        cached_search_tool.clear_cache()
+        cached_search_tool.execute("What is Python?")
+
+        assert mock_vector_store.search.call_count == 2
+
+
+class TestCourseSearchToolEmbeddingCache:
+    """Test that query embeddings are shared across filters and tools"""
+
+    @pytest.fixture(autouse=True)
+    def clear_embedding_cache(self):
+        query_embedding_cache.clear()
+        yield
+        query_embedding_cache.clear()
+
+    @pytest.fixture
+    def embedding_fn(self):
+        return Mock(side_effect=lambda texts: [[0.1, 0.2, 0.3] for _ in texts])
+
+    def test_course_name_filter_reuses_query_embedding(
+        self, mock_vector_store, successful_search_results, embedding_fn
+    ):
+        mock_vector_store.search.return_value = successful_search_results
+        search_tool = CourseSearchTool(mock_vector_store, embedding_fn=embedding_fn)
+
+        search_tool.execute("What is Python?")
+        search_tool.execute("What is Python?", course_name="Python Fundamentals")
+
+        embedding_fn.assert_called_once_with(["What is Python?"])
+        mock_vector_store.search.assert_called_with(
+            query="What is Python?",
+            course_name="Python Fundamentals",
+            lesson_number=None,
+            query_embedding=[0.1, 0.2, 0.3],
+        )
+
+    def test_lesson_number_filter_reuses_query_embedding(
+        self, mock_vector_store, successful_search_results, embedding_fn
+    ):
+        mock_vector_store.search.return_value = successful_search_results
+
+        # Separate tool instances still share the module-level cache
+        CourseSearchTool(mock_vector_store, embedding_fn=embedding_fn).execute(
+            "What is Python?", lesson_number=1
+        )
+        CourseSearchTool(mock_vector_store, embedding_fn=embedding_fn).execute(
+            "What is Python?", lesson_number=2
+        )
+
+        embedding_fn.assert_called_once_with(["What is Python?"])
+        assert mock_vector_store.search.call_count == 2
+
+    def test_embedding_functions_do_not_share_entries(
+        self, mock_vector_store, successful_search_results, embedding_fn
+    ):
+        mock_vector_store.search.return_value = successful_search_results
+        other_fn = Mock(side_effect=lambda texts: [[0.9, 0.8, 0.7] for _ in texts])
+
+        CourseSearchTool(mock_vector_store, embedding_fn=embedding_fn).execute(
+            "What is Python?"
+        )
+        CourseSearchTool(mock_vector_store, embedding_fn=other_fn).execute(
+            "What is Python?"
+        )
+
+        # A different model embeds the query itself instead of reusing a vector
+        other_fn.assert_called_once_with(["What is Python?"])
+        assert mock_vector_store.search.call_args[1]["query_embedding"] == [
+            0.9,
+            0.8,
+            0.7,
+        ]
+
+
 class TestCourseSearchToolIntegration:
     """Integration tests for CourseSearchTool with ToolManager"""
 
@@ -306,6 +498,15 @@ class TestCourseSearchToolIntegration:
         assert "query" in definition["input_schema"]["properties"]
         assert "course_name" in definition["input_schema"]["properties"]
         assert "lesson_number" in definition["input_schema"]["properties"]
+        assert search_tool.get_tool_definition() is definition
+
+    def test_search_tool_has_no_dict(self):
+        """Test that the tool keeps its attributes in slots"""
+        search_tool = CourseSearchTool(Mock())
+
+        assert not hasattr(search_tool, "__dict__")
+        with pytest.raises(AttributeError):
+            search_tool.unexpected = True
 
     def test_tool_manager_registration(self, mock_vector_store):
         """Test that search tool can be registered with ToolManager"""
@@ -346,6 +547,103 @@ class TestCourseSearchToolIntegration:
         # Error should propagate through ToolManager
         assert result == "Database connection failed"
 
+    def test_tool_manager_parallel_execution(
+        self, mock_vector_store, successful_search_results
+    ):
+        """Test that batched tool calls run concurrently"""
+        # Both searches must be in flight at once to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def search(*args, **kwargs):
+            barrier.wait()
+            return successful_search_results
+
+        mock_vector_store.search.side_effect = search
+
+        tool_manager = ToolManager()
+        tool_manager.register_tool(CourseSearchTool(mock_vector_store))
+
+        results = tool_manager.execute_tools_batch(
+            [
+                ("search_course_content", {"query": "variables"}),
+                ("search_course_content", {"query": "functions"}),
+            ]
+        )
+
+        assert len(results) == 2
+        assert all("[Python Fundamentals - Lesson 1]" in r for r in results)
+        assert len(tool_manager.get_last_sources()) == 2
+
+    def test_batch_keeps_sources_from_search_before_outline(
+        self, mock_vector_store, successful_search_results
+    ):
+        """Test that an outline call in the same batch keeps the search sources"""
+        mock_vector_store.search.return_value = successful_search_results
+
+        tool_manager = ToolManager()
+        tool_manager.register_tool(CourseSearchTool(mock_vector_store))
+        tool_manager.register_tool(CourseOutlineTool(mock_vector_store))
+
+        tool_manager.execute_tools_batch(
+            [
+                ("search_course_content", {"query": "variables"}),
+                ("get_course_outline", {"course_name": "Python"}),
+            ]
+        )
+
+        sources = tool_manager.get_last_sources()
+        assert [source["text"] for source in sources] == [
+            "Python Fundamentals - Lesson 1",
+            "Python Fundamentals - Lesson 2",
+        ]
+
+    def test_sources_isolated_between_threads(self, mock_vector_store):
+        """Test that concurrent searches each see their own sources"""
+        both_searched = threading.Barrier(2)
+
+        def search(query, **kwargs):
+            return SearchResults(
+                documents=[f"Content about {query}"],
+                metadata=[{"course_title": query, "lesson_number": 1}],
+                distances=[0.1],
+            )
+
+        mock_vector_store.search.side_effect = search
+        tool_manager = ToolManager()
+        tool_manager.register_tool(CourseSearchTool(mock_vector_store))
+        seen = {}
+
+        def run(query):
+            tool_manager.execute_tool("search_course_content", query=query)
+            both_searched.wait(timeout=5)  # Both searches done before reading
+            seen[query] = tool_manager.get_last_sources()
+
+        threads = [threading.Thread(target=run, args=(q,)) for q in ("MCP", "RAG")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert seen["MCP"][0]["text"] == "MCP - Lesson 1"
+        assert seen["RAG"][0]["text"] == "RAG - Lesson 1"
+
+    def test_tools_in_one_context_keep_separate_sources(
+        self, mock_vector_store, successful_search_results
+    ):
+        """Test that tools and managers in one context never share sources"""
+        mock_vector_store.search.return_value = successful_search_results
+
+        first_manager = ToolManager()
+        first_manager.register_tool(CourseSearchTool(mock_vector_store))
+        first_manager.execute_tool("search_course_content", query="variables")
+
+        # Building another tool must not wipe the first tool's sources
+        second_manager = ToolManager()
+        second_manager.register_tool(CourseSearchTool(mock_vector_store))
+
+        assert len(first_manager.get_last_sources()) == 2
+        assert second_manager.get_last_sources() == []
+
     def test_sources_retrieval_through_tool_manager(
         self, mock_vector_store, successful_search_results
     ):
@@ -377,34 +675,37 @@ class TestCourseSearchToolErrorConditions:
         """Test handling of None query"""
         search_tool = CourseSearchTool(mock_vector_store)
 
-        # This should not crash the application
-        try:
-            result = search_tool.execute(None)
-            # If it returns something, it should be a string
-            assert isinstance(result, str)
-        except Exception as e:
-            # If it raises an exception, that's a bug we need to fix
-            pytest.fail(f"Tool should handle None query gracefully, but raised: {e}")
-
-    def test_empty_string_query(self, mock_vector_store, empty_search_results):
-        """Test handling of empty string query"""
-        mock_vector_store.search.return_value = empty_search_results
+        result = search_tool.execute(None)
+
+        assert result == "No relevant content found."
+        mock_vector_store.search.assert_not_called()
+
+    @pytest.mark.parametrize("query", ["", "   \n\t"])
+    def test_empty_string_query(self, mock_vector_store, query):
+        """Test handling of empty and whitespace-only queries"""
         search_tool = CourseSearchTool(mock_vector_store)
+        search_tool.last_sources = [{"text": "stale", "link": None}]
 
-        result = search_tool.execute("")
-        assert isinstance(result, str)
+        result = search_tool.execute(query)
 
-    def test_very_long_query(self, mock_vector_store, successful_search_results):
-        """Test handling of very long queries"""
+        assert result == "No relevant content found."
+        assert len(search_tool.last_sources) == 0
+        mock_vector_store.search.assert_not_called()
+
+    @pytest.mark.parametrize("n", [1, 100, 1000])
+    def test_very_long_query(self, mock_vector_store, successful_search_results, n):
+        """Test handling of very long queries, including the cache key path"""
         mock_vector_store.search.return_value = successful_search_results
-        search_tool = CourseSearchTool(mock_vector_store)
+        search_tool = CourseSearchTool(mock_vector_store, cache=TTLCache())
 
-        long_query = "What is Python? " * 1000  # Very long query
+        long_query = "What is Python? " * n
         result = search_tool.execute(long_query)
 
-        # Should still work
-        assert isinstance(result, str)
+        # Should still work, and repeat lookups hash to the same entry
+        assert result
+        assert search_tool.execute(long_query) == result
         mock_vector_store.search.assert_called_once()
+        assert mock_vector_store.search.call_args.kwargs["query"] == long_query
 
     def test_special_characters_in_query(
         self, mock_vector_store, successful_search_results
@@ -5,162 +5,161 @@ These tests verify the complete query pipeline from user input to response,
 helping identify where "query failed" errors might be occurring in the full system.
 """
 
-import os
-import sys
-from unittest.mock import MagicMock, Mock, patch
+from types import SimpleNamespace
+from unittest.mock import DEFAULT, Mock, create_autospec, patch
 
 import pytest
-
-# Add backend to path
-backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, backend_dir)
-
 from rag_system import RAGSystem
 from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
-from vector_store import SearchResults
+from vector_store import SearchResults, VectorStore
+
+PYTHON_RESULTS = SearchResults(
+    documents=["Python is a programming language"],
+    metadata=[{"course_title": "Python Basics", "lesson_number": 1}],
+    distances=[0.1],
+)
+STORE_ERROR_RESULTS = SearchResults(
+    documents=[], metadata=[], distances=[], error="Database connection error"
+)
+
+
+def _lesson_links(pairs):
+    return dict.fromkeys(pairs, "http://example.com/lesson1")
+
+
+def _make_vector_store_mock(results):
+    """Build an autospecced VectorStore whose searches return results"""
+    store = create_autospec(VectorStore, instance=True)
+    store.search.return_value = results
+    store.get_lesson_links.side_effect = _lesson_links
+    return store
+
+
+@pytest.fixture(scope="class", autouse=True)
+def patched_rag(request):
+    """Patch RAGSystem's component classes once per test class"""
+    with patch.multiple(
+        "rag_system",
+        autospec=True,
+        AIGenerator=DEFAULT,
+        VectorStore=DEFAULT,
+        DocumentProcessor=DEFAULT,
+        SessionManager=DEFAULT,
+    ) as mocks:
+        # Autospec only sees class attributes; RAGSystem also reads this one.
+        # It returns one embedding per text, as the real function does
+        mocks["VectorStore"].return_value.embedding_function = Mock(
+            return_value=[[0.0]]
+        )
+        request.cls.mocks = SimpleNamespace(**mocks)
+        yield request.cls.mocks
 
 
-class TestRAGSystemQueryFlow:
-    """Test the complete query flow through RAG system"""
+@pytest.fixture(scope="class")
+def shared_rag_system(patched_rag, mock_config):
+    """One RAGSystem per test class, built on the patched components"""
+    return RAGSystem(mock_config)
+
 
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_successful_content_query_flow(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
+@pytest.fixture
+def rag_system(shared_rag_system):
+    """The class's RAGSystem, with component mocks and tool state reset after use"""
+    yield shared_rag_system
+    for component in (
+        shared_rag_system.document_processor,
+        shared_rag_system.vector_store,
+        shared_rag_system.ai_generator,
+        shared_rag_system.session_manager,
     ):
-        """Test successful content query from start to finish"""
-        # Setup mocks
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
+        component.reset_mock(return_value=True, side_effect=True)
+    shared_rag_system.tool_manager.reset_sources()
+    shared_rag_system.search_tool.clear_cache()
 
-        # Mock successful search results
-        search_results = SearchResults(
-            documents=["Python is a programming language"],
-            metadata=[{"course_title": "Python Basics", "lesson_number": 1}],
-            distances=[0.1],
-        )
-        mock_vector_store_instance.search.return_value = search_results
-        mock_vector_store_instance.get_lesson_link.return_value = (
-            "http://example.com/lesson1"
-        )
 
-        # Mock AI generator that uses tools
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
-        mock_ai_instance.generate_response.return_value = (
-            "Python is a high-level programming language used for various applications."
-        )
+@pytest.fixture(autouse=True)
+def reset_patched_rag(patched_rag):
+    """Forget calls made on the class mocks, keeping their specced instances"""
+    yield
+    for mock in vars(patched_rag).values():
+        mock.reset_mock()
 
-        # Mock session manager
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
 
-        # Create RAG system
-        rag_system = RAGSystem(mock_config)
+@pytest.mark.xdist_group(name="rag_query")
+class TestRAGSystemQueryFlow:
+    """Test the complete query flow through RAG system"""
 
-        # Execute query
-        response, sources = rag_system.query(
-            "What is Python?", session_id="test_session"
+    @pytest.mark.parametrize(
+        "session_id,history_calls,add_calls",
+        [
+            pytest.param("test_session", 1, 1, id="with-session"),
+            pytest.param(None, 0, 0, id="without-session"),
+        ],
+    )
+    def test_content_query_flow(self, rag_system, session_id, history_calls, add_calls):
+        """Test content queries from start to finish, with and without a session"""
+        # Mock successful search results
+        mock_vector_store_instance = rag_system.vector_store
+        mock_vector_store_instance.search.return_value = PYTHON_RESULTS
+        mock_vector_store_instance.get_lesson_links.side_effect = _lesson_links
+
+        # Mock AI generator that searches for the first question only
+        answer = "Python is a high-level programming language."
+
+        def generate_response(query, tool_manager, **kwargs):
+            if "First query" in query:
+                tool_manager.execute_tool("search_course_content", query="Python")
+            return answer
+
+        mock_ai_instance = rag_system.ai_generator
+        mock_ai_instance.generate_response.side_effect = generate_response
+
+        mock_session_instance = rag_system.session_manager
+        queries = ("First query", "Second query")
+        expected_sources = (
+            [
+                {
+                    "text": "Python Basics - Lesson 1",
+                    "link": "http://example.com/lesson1",
+                }
+            ],
+            # Reset after the first query, so the second reports none
+            [],
         )
 
-        # Verify the flow
-        assert (
-            response
-            == "Python is a high-level programming language used for various applications."
-        )
+        for query, expected in zip(queries, expected_sources):
+            response, sources = rag_system.query(query, session_id=session_id)
+
+            assert response == answer
+            assert sources == expected
 
         # Verify AI generator was called with tools
-        mock_ai_instance.generate_response.assert_called_once()
+        assert mock_ai_instance.generate_response.call_count == len(queries)
         call_args = mock_ai_instance.generate_response.call_args
         assert "tools" in call_args[1]
         assert "tool_manager" in call_args[1]
+        # The semantic cache matches the bare question, not the prompt template
+        assert call_args[1]["cache_query"] == queries[-1]
 
-        # Verify session management
-        mock_session_instance.get_conversation_history.assert_called_once_with(
-            "test_session"
-        )
-        mock_session_instance.add_exchange.assert_called_once()
-
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_query_without_session(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-    ):
-        """Test query without session ID"""
-        # Setup basic mocks
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
-
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
-        mock_ai_instance.generate_response.return_value = "Response without session"
+        # Verify session management only happens with a session
+        get_history = mock_session_instance.get_conversation_messages
+        assert get_history.call_count == history_calls * len(queries)
+        if history_calls:
+            get_history.assert_called_with(session_id)
+        assert mock_session_instance.add_exchange.call_count == add_calls * len(queries)
 
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
-
-        rag_system = RAGSystem(mock_config)
-
-        # Execute query without session
-        response, sources = rag_system.query("What is Python?")
-
-        # Verify no session operations were called
-        mock_session_instance.get_conversation_history.assert_not_called()
-        mock_session_instance.add_exchange.assert_not_called()
-
-        # Verify response was still generated
-        assert response == "Response without session"
-
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_vector_store_error_propagation(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-    ):
+    def test_vector_store_error_propagation(self, rag_system):
         """Test how vector store errors propagate through the system"""
         # Setup vector store to return error
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
-
-        error_results = SearchResults(
-            documents=[],
-            metadata=[],
-            distances=[],
-            error="Vector database connection failed",
-        )
-        mock_vector_store_instance.search.return_value = error_results
+        mock_vector_store_instance = rag_system.vector_store
+
+        mock_vector_store_instance.search.return_value = STORE_ERROR_RESULTS
 
         # Mock AI generator
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
+        mock_ai_instance = rag_system.ai_generator
         mock_ai_instance.generate_response.return_value = (
             "I'm sorry, I couldn't search the course materials due to a database error."
         )
 
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
-
-        rag_system = RAGSystem(mock_config)
-
         # Execute query
         response, sources = rag_system.query("What is Python?")
 
@@ -168,67 +167,20 @@ class TestRAGSystemQueryFlow:
         assert isinstance(response, str)
         assert len(sources) == 0  # No sources due to error
 
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_ai_generator_error_handling(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-    ):
+    def test_ai_generator_error_handling(self, rag_system):
         """Test handling when AI generator fails"""
-        # Setup mocks
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
-
         # Mock AI generator that raises exception
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
-        mock_ai_instance.generate_response.side_effect = Exception(
+        mock_ai_instance = rag_system.ai_generator
+        mock_ai_instance.generate_response.side_effect = RuntimeError(
             "AI API connection failed"
         )
 
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
-
-        rag_system = RAGSystem(mock_config)
-
         # Execute query - should raise exception
-        with pytest.raises(Exception) as exc_info:
+        with pytest.raises(RuntimeError, match="AI API connection failed"):
             rag_system.query("What is Python?")
 
-        assert "AI API connection failed" in str(exc_info.value)
-
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_tool_registration_on_initialization(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-    ):
+    def test_tool_registration_on_initialization(self, rag_system):
         """Test that tools are properly registered during RAG system initialization"""
-        # Setup mocks
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
-
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
-
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
-
-        # Create RAG system
-        rag_system = RAGSystem(mock_config)
-
         # Verify tools are registered
         assert "search_course_content" in rag_system.tool_manager.tools
         assert "get_course_outline" in rag_system.tool_manager.tools
@@ -241,71 +193,10 @@ class TestRAGSystemQueryFlow:
         assert "search_course_content" in tool_names
         assert "get_course_outline" in tool_names
 
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_sources_tracking_and_reset(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-    ):
-        """Test that sources are properly tracked and reset between queries"""
-        # Setup vector store with results
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
-
-        search_results = SearchResults(
-            documents=["Content 1", "Content 2"],
-            metadata=[
-                {"course_title": "Course A", "lesson_number": 1},
-                {"course_title": "Course B", "lesson_number": 2},
-            ],
-            distances=[0.1, 0.2],
-        )
-        mock_vector_store_instance.search.return_value = search_results
-        mock_vector_store_instance.get_lesson_link.return_value = (
-            "http://example.com/lesson"
-        )
-
-        # Mock AI generator
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
-        mock_ai_instance.generate_response.return_value = "Test response"
-
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
-
-        rag_system = RAGSystem(mock_config)
-
-        # First query
-        response1, sources1 = rag_system.query("First query")
-
-        # Second query
-        response2, sources2 = rag_system.query("Second query")
-
-        # Sources should be properly tracked and reset
-        # (Note: This assumes the tool is actually called by the AI)
-        # The sources list should be consistent between calls
-        assert isinstance(sources1, list)
-        assert isinstance(sources2, list)
-
     def test_real_tool_execution_flow(self, mock_config):
         """Test the actual tool execution flow with real tools but mocked dependencies"""
         # Create real tool manager and tools with mocked vector store
-        mock_vector_store = Mock()
-
-        # Mock successful search
-        search_results = SearchResults(
-            documents=["Python is a programming language"],
-            metadata=[{"course_title": "Python Basics", "lesson_number": 1}],
-            distances=[0.1],
-        )
-        mock_vector_store.search.return_value = search_results
-        mock_vector_store.get_lesson_link.return_value = "http://example.com/lesson1"
+        mock_vector_store = _make_vector_store_mock(PYTHON_RESULTS)
 
         # Create real tools
         tool_manager = ToolManager()
@@ -333,11 +224,7 @@ class TestRAGSystemQueryFlow:
     def test_tool_error_handling_in_manager(self, mock_config):
         """Test error handling when tools fail during execution"""
         # Create tool with failing vector store
-        mock_vector_store = Mock()
-        error_results = SearchResults(
-            documents=[], metadata=[], distances=[], error="Database connection error"
-        )
-        mock_vector_store.search.return_value = error_results
+        mock_vector_store = _make_vector_store_mock(STORE_ERROR_RESULTS)
 
         tool_manager = ToolManager()
         search_tool = CourseSearchTool(mock_vector_store)
@@ -353,21 +240,11 @@ class TestRAGSystemQueryFlow:
         assert len(sources) == 0
 
 
+@pytest.mark.xdist_group(name="rag_init")
 class TestRAGSystemInitialization:
     """Test RAG system initialization and component setup"""
 
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_component_initialization(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-    ):
+    def test_component_initialization(self, mock_config):
         """Test that all components are properly initialized"""
         rag_system = RAGSystem(mock_config)
 
@@ -381,76 +258,50 @@ class TestRAGSystemInitialization:
         assert rag_system.outline_tool is not None
 
         # Verify components were called with correct config
-        mock_doc_proc.assert_called_once_with(
+        self.mocks.DocumentProcessor.assert_called_once_with(
             mock_config.CHUNK_SIZE, mock_config.CHUNK_OVERLAP
         )
-        mock_vector_store.assert_called_once_with(
+        self.mocks.VectorStore.assert_called_once_with(
             mock_config.CHROMA_PATH,
             mock_config.EMBEDDING_MODEL,
             mock_config.MAX_RESULTS,
         )
-        mock_ai_gen.assert_called_once_with(
+        self.mocks.AIGenerator.assert_called_once_with(
             mock_config.ANTHROPIC_API_KEY, mock_config.ANTHROPIC_MODEL
         )
-        mock_session_mgr.assert_called_once_with(mock_config.MAX_HISTORY)
-
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_initialization_with_missing_config(
-        self, mock_session_mgr, mock_doc_proc, mock_vector_store, mock_ai_gen
-    ):
+        self.mocks.SessionManager.assert_called_once_with(mock_config.MAX_HISTORY)
+
+    def test_initialization_with_missing_config(self):
         """Test initialization behavior with missing or invalid config"""
         # Test with None config
-        with pytest.raises(AttributeError):
+        with pytest.raises(AttributeError, match="CHUNK_SIZE"):
             RAGSystem(None)
 
         # Test with incomplete config
-        incomplete_config = Mock()
+        incomplete_config = Mock(spec_set=["CHUNK_SIZE"])
         incomplete_config.CHUNK_SIZE = 800
         # Missing other required attributes
 
-        with pytest.raises(AttributeError):
+        with pytest.raises(AttributeError, match="CHUNK_OVERLAP"):
             RAGSystem(incomplete_config)
 
 
+@pytest.mark.xdist_group(name="rag_courses")
 class TestRAGSystemCourseManagement:
     """Test course document management functionality"""
 
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
     def test_add_course_document_success(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-        sample_course,
-        sample_course_chunks,
+        self, rag_system, sample_course, sample_course_chunks
     ):
         """Test successful course document addition"""
         # Setup mocks
-        mock_doc_proc_instance = Mock()
-        mock_doc_proc.return_value = mock_doc_proc_instance
+        mock_doc_proc_instance = rag_system.document_processor
         mock_doc_proc_instance.process_course_document.return_value = (
             sample_course,
             sample_course_chunks,
         )
 
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
-
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
-
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
-
-        rag_system = RAGSystem(mock_config)
+        mock_vector_store_instance = rag_system.vector_store
 
         # Add course document
         course, chunk_count = rag_system.add_course_document("test_course.txt")
@@ -468,40 +319,22 @@ class TestRAGSystemCourseManagement:
             sample_course_chunks
         )
 
+        # Answers cached before the new content arrived are dropped
+        rag_system.ai_generator.clear_semantic_cache.assert_called_once_with()
+
         # Verify return values
         assert course == sample_course
         assert chunk_count == len(sample_course_chunks)
 
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_add_course_document_error(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-    ):
+    def test_add_course_document_error(self, rag_system):
         """Test error handling during course document addition"""
         # Setup mock to raise exception
-        mock_doc_proc_instance = Mock()
-        mock_doc_proc.return_value = mock_doc_proc_instance
+        mock_doc_proc_instance = rag_system.document_processor
         mock_doc_proc_instance.process_course_document.side_effect = Exception(
             "File not found"
         )
 
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
-
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
-
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
-
-        rag_system = RAGSystem(mock_config)
+        mock_vector_store_instance = rag_system.vector_store
 
         # Add course document - should handle error gracefully
         course, chunk_count = rag_system.add_course_document("nonexistent.txt")
@@ -514,74 +347,42 @@ class TestRAGSystemCourseManagement:
         mock_vector_store_instance.add_course_metadata.assert_not_called()
         mock_vector_store_instance.add_course_content.assert_not_called()
 
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.os.path.exists")
-    @patch("rag_system.os.listdir")
     def test_add_course_folder(
-        self,
-        mock_listdir,
-        mock_exists,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-        sample_course,
-        sample_course_chunks,
+        self, tmp_path, rag_system, sample_course, sample_course_chunks
     ):
         """Test adding course documents from a folder"""
-        # Setup file system mocks
-        mock_exists.return_value = True
-        mock_listdir.return_value = ["course1.txt", "course2.pdf", "readme.md"]
-
-        # Setup document processor mock
-        mock_doc_proc_instance = Mock()
-        mock_doc_proc.return_value = mock_doc_proc_instance
-        mock_doc_proc_instance.process_course_document.return_value = (
-            sample_course,
-            sample_course_chunks,
-        )
+        expected_chunks = len(sample_course_chunks)
+
+        # Real files, so the folder walk runs its actual os calls
+        for file_name in ("course1.txt", "course2.pdf", "readme.md"):
+            (tmp_path / file_name).touch()
+
+        # Setup document processor mock; each document holds a distinct course
+        # so neither is skipped as already loaded
+        second_course = sample_course.model_copy(update={"title": "Advanced Python"})
+        mock_doc_proc_instance = rag_system.document_processor
+        mock_doc_proc_instance.process_course_document.side_effect = [
+            (sample_course, sample_course_chunks),
+            (second_course, sample_course_chunks),
+        ]
 
         # Setup vector store mock
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
+        mock_vector_store_instance = rag_system.vector_store
         mock_vector_store_instance.get_existing_course_titles.return_value = []
 
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
-
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
-
-        rag_system = RAGSystem(mock_config)
-
         # Add course folder
-        total_courses, total_chunks = rag_system.add_course_folder("test_folder")
+        total_courses, total_chunks = rag_system.add_course_folder(str(tmp_path))
 
         # Should process both .txt and .pdf files, but not .md
         assert mock_doc_proc_instance.process_course_document.call_count == 2
         assert total_courses == 2
-        assert total_chunks == len(sample_course_chunks) * 2
-
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    @patch("rag_system.SessionManager")
-    def test_get_course_analytics(
-        self,
-        mock_session_mgr,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_config,
-    ):
+        assert total_chunks == expected_chunks * 2
+        rag_system.ai_generator.clear_semantic_cache.assert_called_once_with()
+
+    def test_get_course_analytics(self, rag_system):
         """Test course analytics retrieval"""
         # Setup vector store mock
-        mock_vector_store_instance = Mock()
-        mock_vector_store.return_value = mock_vector_store_instance
+        mock_vector_store_instance = rag_system.vector_store
         mock_vector_store_instance.get_course_count.return_value = 5
         mock_vector_store_instance.get_existing_course_titles.return_value = [
             "Course A",
@@ -589,14 +390,6 @@ class TestRAGSystemCourseManagement:
             "Course C",
         ]
 
-        mock_ai_instance = Mock()
-        mock_ai_gen.return_value = mock_ai_instance
-
-        mock_session_instance = Mock()
-        mock_session_mgr.return_value = mock_session_instance
-
-        rag_system = RAGSystem(mock_config)
-
         # Get analytics
         analytics = rag_system.get_course_analytics()
 
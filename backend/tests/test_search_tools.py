@@ -1,7 +1,16 @@
-from unittest.mock import MagicMock, Mock
+import inspect
+import re
+import sys
+from unittest.mock import Mock
 
 import pytest
-from search_tools import CourseOutlineTool, CourseSearchTool, Tool, ToolManager
+from search_tools import (
+    CourseOutlineTool,
+    CourseSearchTool,
+    SourceList,
+    Tool,
+    ToolManager,
+)
 from vector_store import SearchResults
 
 
@@ -13,25 +22,128 @@ class MockTool(Tool):
         return "mock result"
 
 
+def _make_mock_tool():
+    tool = MockTool()
+    tool.last_sources = [{"text": "test source", "link": "http://test.com"}]
+    return tool
+
+
+def _make_tool_manager():
+    return ToolManager()
+
+
+class _NamelessTool:
+    def get_tool_definition(self):
+        return {"description": "bad tool"}
+
+
+EMPTY_RESULTS = SearchResults(documents=[], metadata=[], distances=[])
+
+OUTLINE_METADATA = [
+    {
+        "title": "Python Basics Course",
+        "course_link": "http://example.com/python",
+        "lessons": [
+            {"lesson_number": 1, "lesson_title": "Introduction"},
+            {"lesson_number": 2, "lesson_title": "Variables"},
+        ],
+    }
+]
+
+
+def _contains_all(*texts):
+    """Compile one pattern matching text that contains every one of texts"""
+    return re.compile("".join(f"(?=.*{re.escape(text)})" for text in texts), re.S)
+
+
+_FULL_OUTLINE = _contains_all(
+    "**Python Basics Course**",
+    "🔗 [View Course](http://example.com/python)",
+    "**Lessons:**",
+    "1. Introduction",
+    "2. Variables",
+)
+_UNLINKED_OUTLINE = _contains_all("**Python Basics Course**", "1. Introduction")
+_EMPTY_OUTLINE = _contains_all("**Python Basics Course**", "*No lessons available*")
+
+
+class FakeVectorStore:
+    """Plain stand-in for VectorStore; tests set the *_return attributes"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.search_return = None
+        self.resolve_return = "Python Basics Course"
+        self.metadata_return = OUTLINE_METADATA
+
+    def search(self, *args, **kwargs):
+        return self.search_return
+
+    def get_lesson_link(self, *args, **kwargs):
+        return "http://example.com/lesson1"
+
+    def get_lesson_links(self, pairs):
+        return dict.fromkeys(pairs, "http://example.com/lesson1")
+
+    def _resolve_course_name(self, course_name):
+        return self.resolve_return
+
+    def get_all_courses_metadata(self):
+        return self.metadata_return
+
+
+# Stores and tools are built once per session; the per-test fixtures in each
+# class restore their defaults instead of constructing new ones
+@pytest.fixture(scope="session")
+def search_store_template():
+    return FakeVectorStore()
+
+
+@pytest.fixture(scope="session")
+def search_tool_template(search_store_template):
+    return CourseSearchTool(search_store_template)
+
+
+@pytest.fixture(scope="session")
+def search_tool_definition(search_tool_template):
+    return search_tool_template.get_tool_definition()
+
+
+@pytest.fixture(scope="session")
+def outline_store_template():
+    return FakeVectorStore()
+
+
+@pytest.fixture(scope="session")
+def outline_tool_template(outline_store_template):
+    return CourseOutlineTool(outline_store_template)
+
+
+@pytest.fixture(scope="session")
+def outline_tool_definition(outline_tool_template):
+    return outline_tool_template.get_tool_definition()
+
+
 class TestTool:
     def test_tool_is_abstract(self):
-        with pytest.raises(TypeError):
-            Tool()
+        assert inspect.isabstract(Tool), "Tool must remain abstract"
 
 
 class TestCourseSearchTool:
     @pytest.fixture
-    def mock_vector_store(self):
-        mock_store = Mock()
-        mock_store.get_lesson_link.return_value = "http://example.com/lesson1"
-        return mock_store
+    def mock_vector_store(self, search_store_template):
+        search_store_template.reset()
+        return search_store_template
 
     @pytest.fixture
-    def search_tool(self, mock_vector_store):
-        return CourseSearchTool(mock_vector_store)
+    def search_tool(self, search_tool_template, mock_vector_store):
+        search_tool_template.last_sources = SourceList()
+        return search_tool_template
 
-    def test_get_tool_definition(self, search_tool):
-        definition = search_tool.get_tool_definition()
+    def test_get_tool_definition(self, search_tool_definition):
+        definition = search_tool_definition
 
         assert definition["name"] == "search_course_content"
         assert "description" in definition
@@ -47,97 +159,87 @@ class TestCourseSearchTool:
         error_results = SearchResults(
             documents=[], metadata=[], distances=[], error="Database connection failed"
         )
-        mock_vector_store.search.return_value = error_results
+        mock_vector_store.search_return = error_results
 
         result = search_tool.execute("test query")
         assert result == "Database connection failed"
 
-    def test_execute_with_empty_results(self, search_tool, mock_vector_store):
-        empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
-
-        result = search_tool.execute("test query")
-        assert result == "No relevant content found."
-
-    def test_execute_with_course_filter(self, search_tool, mock_vector_store):
-        empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
-
-        result = search_tool.execute("test query", course_name="Python")
-        assert result == "No relevant content found in course 'Python'."
-
-    def test_execute_with_lesson_filter(self, search_tool, mock_vector_store):
-        empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
-
-        result = search_tool.execute("test query", lesson_number=1)
-        assert result == "No relevant content found in lesson 1."
-
-    def test_execute_with_both_filters(self, search_tool, mock_vector_store):
-        empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
-
-        result = search_tool.execute(
-            "test query", course_name="Python", lesson_number=1
+    @pytest.mark.parametrize(
+        "kwargs,expected",
+        [
+            ({}, "No relevant content found."),
+            (
+                {"course_name": "Python"},
+                "No relevant content found in course 'Python'.",
+            ),
+            ({"lesson_number": 1}, "No relevant content found in lesson 1."),
+            (
+                {"course_name": "Python", "lesson_number": 1},
+                "No relevant content found in course 'Python' in lesson 1.",
+            ),
+        ],
+        ids=["no-filter", "course-filter", "lesson-filter", "both-filters"],
+    )
+    def test_execute_no_results(self, search_tool, mock_vector_store, kwargs, expected):
+        mock_vector_store.search_return = EMPTY_RESULTS
+
+        assert search_tool.execute("test query", **kwargs) == expected
+
+    @pytest.mark.parametrize(
+        "documents,metadata,header,source_text,source_link",
+        [
+            (
+                ["This is content about Python"],
+                [{"course_title": "Python Basics", "lesson_number": 1}],
+                "[Python Basics - Lesson 1]",
+                "Python Basics - Lesson 1",
+                "http://example.com/lesson1",
+            ),
+            (
+                ["General course content"],
+                [{"course_title": "Python Basics"}],
+                "[Python Basics]",
+                "Python Basics",
+                None,
+            ),
+        ],
+        ids=["with-lesson", "no-lesson-number"],
+    )
+    def test_execute_with_results(
+        self,
+        search_tool,
+        mock_vector_store,
+        documents,
+        metadata,
+        header,
+        source_text,
+        source_link,
+    ):
+        mock_vector_store.search_return = SearchResults(
+            documents=documents, metadata=metadata, distances=[0.1]
         )
-        assert result == "No relevant content found in course 'Python' in lesson 1."
-
-    def test_execute_with_results(self, search_tool, mock_vector_store):
-        results = SearchResults(
-            documents=["This is content about Python"],
-            metadata=[{"course_title": "Python Basics", "lesson_number": 1}],
-            distances=[0.1],
-        )
-        mock_vector_store.search.return_value = results
-
-        result = search_tool.execute("test query")
-
-        assert "[Python Basics - Lesson 1]" in result
-        assert "This is content about Python" in result
-        assert len(search_tool.last_sources) == 1
-        assert search_tool.last_sources[0]["text"] == "Python Basics - Lesson 1"
-        assert search_tool.last_sources[0]["link"] == "http://example.com/lesson1"
-
-    def test_execute_with_no_lesson_number(self, search_tool, mock_vector_store):
-        results = SearchResults(
-            documents=["General course content"],
-            metadata=[{"course_title": "Python Basics"}],
-            distances=[0.2],
-        )
-        mock_vector_store.search.return_value = results
 
         result = search_tool.execute("test query")
 
-        assert "[Python Basics]" in result
-        assert "General course content" in result
-        assert len(search_tool.last_sources) == 1
-        assert search_tool.last_sources[0]["text"] == "Python Basics"
-        assert search_tool.last_sources[0]["link"] is None
+        assert header in result
+        assert documents[0] in result
+        assert search_tool.last_sources.to_list() == [
+            {"text": source_text, "link": source_link}
+        ]
 
 
 class TestCourseOutlineTool:
     @pytest.fixture
-    def mock_vector_store(self):
-        mock_store = Mock()
-        mock_store._resolve_course_name.return_value = "Python Basics Course"
-        mock_store.get_all_courses_metadata.return_value = [
-            {
-                "title": "Python Basics Course",
-                "course_link": "http://example.com/python",
-                "lessons": [
-                    {"lesson_number": 1, "lesson_title": "Introduction"},
-                    {"lesson_number": 2, "lesson_title": "Variables"},
-                ],
-            }
-        ]
-        return mock_store
+    def mock_vector_store(self, outline_store_template):
+        outline_store_template.reset()
+        return outline_store_template
 
     @pytest.fixture
-    def outline_tool(self, mock_vector_store):
-        return CourseOutlineTool(mock_vector_store)
+    def outline_tool(self, outline_tool_template, mock_vector_store):
+        return outline_tool_template
 
-    def test_get_tool_definition(self, outline_tool):
-        definition = outline_tool.get_tool_definition()
+    def test_get_tool_definition(self, outline_tool_definition):
+        definition = outline_tool_definition
 
         assert definition["name"] == "get_course_outline"
         assert "description" in definition
@@ -148,99 +250,120 @@ class TestCourseOutlineTool:
         assert "course_name" in properties
 
     def test_execute_course_not_found(self, outline_tool, mock_vector_store):
-        mock_vector_store._resolve_course_name.return_value = None
+        mock_vector_store.resolve_return = None
 
         result = outline_tool.execute("NonExistent")
         assert result == "No course found matching 'NonExistent'"
 
     def test_execute_metadata_not_found(self, outline_tool, mock_vector_store):
-        mock_vector_store._resolve_course_name.return_value = "Python Basics Course"
-        mock_vector_store.get_all_courses_metadata.return_value = []
+        mock_vector_store.resolve_return = "Python Basics Course"
+        mock_vector_store.metadata_return = []
 
         result = outline_tool.execute("Python")
         assert result == "No course found matching 'Python'"
 
-    def test_execute_successful(self, outline_tool):
-        result = outline_tool.execute("Python")
-
-        assert "**Python Basics Course**" in result
-        assert "🔗 [View Course](http://example.com/python)" in result
-        assert "**Lessons:**" in result
-        assert "1. Introduction" in result
-        assert "2. Variables" in result
-
-    def test_execute_no_link(self, outline_tool, mock_vector_store):
-        mock_vector_store.get_all_courses_metadata.return_value = [
-            {
-                "title": "Python Basics Course",
-                "course_link": "",
-                "lessons": [{"lesson_number": 1, "lesson_title": "Introduction"}],
-            }
-        ]
-
-        result = outline_tool.execute("Python")
-
-        assert "**Python Basics Course**" in result
-        assert "🔗" not in result
-        assert "1. Introduction" in result
-
-    def test_execute_no_lessons(self, outline_tool, mock_vector_store):
-        mock_vector_store.get_all_courses_metadata.return_value = [
-            {
-                "title": "Python Basics Course",
-                "course_link": "http://example.com/python",
-                "lessons": [],
-            }
-        ]
+    @pytest.mark.parametrize(
+        "courses,expected_contains,expected_absent",
+        [
+            (
+                OUTLINE_METADATA,
+                _FULL_OUTLINE,
+                [],
+            ),
+            (
+                [
+                    {
+                        "title": "Python Basics Course",
+                        "course_link": "",
+                        "lessons": [
+                            {"lesson_number": 1, "lesson_title": "Introduction"}
+                        ],
+                    }
+                ],
+                _UNLINKED_OUTLINE,
+                ["🔗"],
+            ),
+            (
+                [
+                    {
+                        "title": "Python Basics Course",
+                        "course_link": "http://example.com/python",
+                        "lessons": [],
+                    }
+                ],
+                _EMPTY_OUTLINE,
+                [],
+            ),
+        ],
+        ids=["successful", "no-link", "no-lessons"],
+    )
+    def test_execute_variants(
+        self,
+        outline_tool,
+        mock_vector_store,
+        courses,
+        expected_contains,
+        expected_absent,
+    ):
+        mock_vector_store.metadata_return = courses
 
         result = outline_tool.execute("Python")
 
-        assert "**Python Basics Course**" in result
-        assert "*No lessons available*" in result
+        assert expected_contains.search(result), expected_contains.pattern
+        for text in expected_absent:
+            assert text not in result
 
 
 class TestToolManager:
-    @pytest.fixture
-    def tool_manager(self):
-        return ToolManager()
-
-    @pytest.fixture
-    def mock_tool(self):
-        tool = MockTool()
-        tool.last_sources = [{"text": "test source", "link": "http://test.com"}]
-        return tool
-
-    def test_register_tool(self, tool_manager, mock_tool):
+    def test_register_tool(self):
+        tool_manager = _make_tool_manager()
+        mock_tool = _make_mock_tool()
         tool_manager.register_tool(mock_tool)
         assert "mock_tool" in tool_manager.tools
 
-    def test_register_tool_without_name(self, tool_manager):
-        bad_tool = Mock()
-        bad_tool.get_tool_definition.return_value = {"description": "bad tool"}
+    def test_register_tool_interns_name(self):
+        tool_manager = _make_tool_manager()
+        name = "".join(["dynamic", "_tool"])  # Built at runtime, not interned
+        tool = Mock()
+        tool.get_tool_definition.return_value = {"name": name}
+
+        tool_manager.register_tool(tool)
+
+        (key,) = tool_manager.tools
+        assert key is sys.intern(name)
 
+    def test_register_tool_without_name(self):
+        tool_manager = _make_tool_manager()
         with pytest.raises(
             ValueError, match="Tool must have a 'name' in its definition"
         ):
-            tool_manager.register_tool(bad_tool)
+            tool_manager.register_tool(_NamelessTool())
 
-    def test_get_tool_definitions(self, tool_manager, mock_tool):
+    def test_get_tool_definitions(self):
+        tool_manager = _make_tool_manager()
+        mock_tool = _make_mock_tool()
         tool_manager.register_tool(mock_tool)
         definitions = tool_manager.get_tool_definitions()
 
         assert len(definitions) == 1
         assert definitions[0]["name"] == "mock_tool"
 
-    def test_execute_tool(self, tool_manager, mock_tool):
+    def test_execute_tool(self):
+        tool_manager = _make_tool_manager()
+        mock_tool = _make_mock_tool()
         tool_manager.register_tool(mock_tool)
         result = tool_manager.execute_tool("mock_tool", param1="value1")
 
         assert result == "mock result"
 
-    def test_execute_nonexistent_tool(self, tool_manager):
+    def test_execute_nonexistent_tool(self):
+        tool_manager = _make_tool_manager()
         result = tool_manager.execute_tool("nonexistent_tool")
         assert result == "Tool 'nonexistent_tool' not found"
 
-    def test_get_last_sources(self, tool_manager, mock_tool):
+    def test_get_last_sources(self):
+        tool_manager = _make_tool_manager()
+        mock_tool = _make_mock_tool()
         tool_manager.register_tool(mock_tool)
         sources = tool_manager.get_last_sources()
 
@@ -248,11 +371,14 @@ class TestToolManager:
         assert sources[0]["text"] == "test source"
         assert sources[0]["link"] == "http://test.com"
 
-    def test_get_last_sources_empty(self, tool_manager):
+    def test_get_last_sources_empty(self):
+        tool_manager = _make_tool_manager()
         sources = tool_manager.get_last_sources()
         assert sources == []
 
-    def test_reset_sources(self, tool_manager, mock_tool):
+    def test_reset_sources(self):
+        tool_manager = _make_tool_manager()
+        mock_tool = _make_mock_tool()
         tool_manager.register_tool(mock_tool)
 
         assert len(tool_manager.get_last_sources()) == 1
@@ -260,4 +386,4 @@ class TestToolManager:
         tool_manager.reset_sources()
 
         assert len(tool_manager.get_last_sources()) == 0
-        assert mock_tool.last_sources == []
+        assert len(mock_tool.last_sources) == 0
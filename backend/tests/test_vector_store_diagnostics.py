@@ -5,409 +5,421 @@ These tests are designed to identify the root cause of "query failed" errors
 by testing the actual vector database state, data availability, and functionality.
 """
 
+import logging
 import os
-import shutil
-import sys
-import tempfile
-from unittest.mock import Mock, patch
+import re
+from typing import NamedTuple
+from unittest.mock import patch
 
+import numpy as np
 import pytest
+from chromadb.api.types import EmbeddingFunction
+from vector_store import SearchResults, VectorStore
 
-# Add backend to path
-backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, backend_dir)
+logger = logging.getLogger(__name__)
 
-from models import Course, CourseChunk, Lesson
-from vector_store import SearchResults, VectorStore
 
+class FakeEmbedder(EmbeddingFunction):
+    """Zero-vector embedder for tests that only check VectorStore wiring"""
 
-class TestVectorStoreHealth:
-    """Test the basic health and connectivity of the vector store"""
+    def __init__(self):
+        pass
 
-    def test_vector_store_initialization(self):
-        """Test that vector store can be initialized with basic settings"""
-        # Use a temporary directory for testing
-        with tempfile.TemporaryDirectory() as temp_dir:
-            try:
-                vector_store = VectorStore(
-                    chroma_path=temp_dir,
-                    embedding_model="all-MiniLM-L6-v2",
-                    max_results=5,
-                )
+    def __call__(self, input):
+        return [np.zeros(384, dtype=np.float32) for _ in input]
 
-                # Basic checks
-                assert vector_store.client is not None
-                assert vector_store.embedding_function is not None
-                assert vector_store.course_catalog is not None
-                assert vector_store.course_content is not None
-                assert vector_store.max_results == 5
 
-            except Exception as e:
-                pytest.fail(f"Vector store initialization failed: {e}")
+@pytest.fixture
+def wiring_vector_store(tmp_path):
+    """Empty VectorStore that never loads the sentence transformer"""
+    return VectorStore(
+        chroma_path=str(tmp_path),
+        embedding_model="unused",
+        max_results=5,
+        embedding_function=FakeEmbedder(),
+    )
 
-    def test_embedding_model_loading(self):
-        """Test that the embedding model loads correctly"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            try:
-                vector_store = VectorStore(
-                    chroma_path=temp_dir,
-                    embedding_model="all-MiniLM-L6-v2",
-                    max_results=5,
-                )
 
-                # Test that embeddings can be generated
-                # This is indirect but tests if the model loaded properly
-                test_text = "This is a test sentence"
-                # The embedding function should be callable
-                assert callable(vector_store.embedding_function)
+@pytest.fixture
+def vector_store(tmp_path, shared_embedding_function):
+    """Empty VectorStore in a fresh directory, sharing the session's model"""
+    return VectorStore(
+        chroma_path=str(tmp_path),
+        embedding_model="all-MiniLM-L6-v2",
+        max_results=5,
+        embedding_function=shared_embedding_function,
+    )
 
-            except Exception as e:
-                pytest.fail(f"Embedding model loading failed: {e}")
 
-    def test_chromadb_collections_creation(self):
-        """Test that ChromaDB collections are created properly"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
-            )
+@pytest.fixture(scope="module")
+def populated_vector_store(
+    tmp_path_factory, shared_embedding_function, sample_course, sample_course_chunks
+):
+    """VectorStore holding the sample course, embedded once for read-only tests"""
+    vector_store = VectorStore(
+        chroma_path=str(tmp_path_factory.mktemp("chroma")),
+        embedding_model="all-MiniLM-L6-v2",
+        max_results=5,
+        embedding_function=shared_embedding_function,
+    )
+    vector_store.add_course_metadata(sample_course)
+    vector_store.add_course_content(sample_course_chunks)
+    return vector_store
 
-            # Test that collections exist and have the right names
-            catalog_name = vector_store.course_catalog.name
-            content_name = vector_store.course_content.name
 
-            assert catalog_name == "course_catalog"
-            assert content_name == "course_content"
+class TestVectorStoreHealth:
+    """Test the basic health and connectivity of the vector store"""
 
-            # Test that collections are initially empty
-            catalog_count = vector_store.course_catalog.count()
-            content_count = vector_store.course_content.count()
+    def test_vector_store_initialization(self, wiring_vector_store):
+        """Test that vector store can be initialized with basic settings"""
+        # Basic checks
+        assert wiring_vector_store.client is not None
+        assert wiring_vector_store.embedding_function is not None
+        assert wiring_vector_store.course_catalog is not None
+        assert wiring_vector_store.course_content is not None
+        assert wiring_vector_store.max_results == 5
+
+    @pytest.mark.slow
+    def test_embedding_model_loading(self, vector_store):
+        """Test that the embedding model loads correctly"""
+        # The embedding function should be callable
+        assert callable(vector_store.embedding_function)
+
+    def test_chromadb_collections_creation(self, wiring_vector_store):
+        """Test that ChromaDB collections are created properly"""
+        # Test that collections exist and have the right names
+        catalog_name = wiring_vector_store.course_catalog.name
+        content_name = wiring_vector_store.course_content.name
+
+        assert catalog_name == "course_catalog"
+        assert content_name == "course_content"
 
-            assert catalog_count == 0
-            assert content_count == 0
+        # Test that collections are initially empty
+        catalog_count = wiring_vector_store.course_catalog.count()
+        content_count = wiring_vector_store.course_content.count()
 
+        assert catalog_count == 0
+        assert content_count == 0
 
+
+# Every test here embeds with the real sentence transformer
+@pytest.mark.slow
 class TestVectorStoreDataOperations:
     """Test data operations in the vector store"""
 
-    def test_add_course_metadata(self, sample_course):
+    def test_add_course_metadata(self, vector_store, sample_course):
         """Test adding course metadata to the vector store"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
-            )
+        # Add course metadata
+        vector_store.add_course_metadata(sample_course)
 
-            # Add course metadata
-            vector_store.add_course_metadata(sample_course)
+        # Verify data was added
+        catalog_count = vector_store.course_catalog.count()
+        assert catalog_count == 1
 
-            # Verify data was added
-            catalog_count = vector_store.course_catalog.count()
-            assert catalog_count == 1
+        # Verify data can be retrieved
+        results = vector_store.course_catalog.get(include=["metadatas"])
+        assert len(results["ids"]) == 1
+        assert results["ids"][0] == sample_course.title
 
-            # Verify data can be retrieved
-            results = vector_store.course_catalog.get()
-            assert len(results["ids"]) == 1
-            assert results["ids"][0] == sample_course.title
+        # Verify metadata structure
+        metadata = results["metadatas"][0]
+        assert metadata["title"] == sample_course.title
+        assert metadata["instructor"] == sample_course.instructor
+        assert "lessons_json" in metadata
 
-            # Verify metadata structure
-            metadata = results["metadatas"][0]
-            assert metadata["title"] == sample_course.title
-            assert metadata["instructor"] == sample_course.instructor
-            assert "lessons_json" in metadata
-
-    def test_add_course_content(self, sample_course_chunks):
+    def test_add_course_content(self, vector_store, sample_course_chunks):
         """Test adding course content chunks to the vector store"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
-            )
-
-            # Add course content
+        # Add course content; all chunks must go to Chroma in one bulk add
+        collection = vector_store.course_content
+        with patch.object(collection, "add", wraps=collection.add) as add:
             vector_store.add_course_content(sample_course_chunks)
+        add.assert_called_once()
 
-            # Verify data was added
-            content_count = vector_store.course_content.count()
-            assert content_count == len(sample_course_chunks)
+        # Verify data was added
+        content_count = vector_store.course_content.count()
+        assert content_count == len(sample_course_chunks)
 
-            # Verify data can be retrieved
-            results = vector_store.course_content.get()
-            assert len(results["ids"]) == len(sample_course_chunks)
+        # Verify data can be retrieved
+        results = vector_store.course_content.get(include=["metadatas"])
+        assert len(results["ids"]) == len(sample_course_chunks)
 
-            # Verify metadata structure
-            for i, metadata in enumerate(results["metadatas"]):
-                chunk = sample_course_chunks[i]
-                assert metadata["course_title"] == chunk.course_title
-                assert metadata["lesson_number"] == chunk.lesson_number
-                assert metadata["chunk_index"] == chunk.chunk_index
+        # Verify metadata structure
+        for i, metadata in enumerate(results["metadatas"]):
+            chunk = sample_course_chunks[i]
+            assert metadata["course_title"] == chunk.course_title
+            assert metadata["lesson_number"] == chunk.lesson_number
+            assert metadata["chunk_index"] == chunk.chunk_index
 
-    def test_search_with_data(self, sample_course, sample_course_chunks):
+    def test_search_with_data(self, populated_vector_store):
         """Test search functionality with actual data"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
-            )
-
-            # Add test data
-            vector_store.add_course_metadata(sample_course)
-            vector_store.add_course_content(sample_course_chunks)
-
-            # Test search
-            results = vector_store.search("Python programming")
-
-            # Verify search returns results
-            assert not results.is_empty()
-            assert results.error is None
-            assert len(results.documents) > 0
-            assert len(results.metadata) > 0
-            assert len(results.distances) > 0
-
-            # Verify metadata structure
-            for metadata in results.metadata:
-                assert "course_title" in metadata
-                assert "lesson_number" in metadata
-                assert "chunk_index" in metadata
-
-    def test_search_with_course_filter(self, sample_course, sample_course_chunks):
+        # Test search
+        results = populated_vector_store.search("Python programming")
+
+        # Verify search returns results
+        assert not results.is_empty()
+        assert results.error is None
+        assert len(results.documents) > 0
+        assert len(results.metadata) > 0
+        assert results.distance_array.size > 0
+        assert (results.distance_array >= 0).all()
+
+        # Verify metadata structure
+        for metadata in results.metadata:
+            assert "course_title" in metadata
+            assert "lesson_number" in metadata
+            assert "chunk_index" in metadata
+
+    def test_search_with_course_filter(self, populated_vector_store):
         """Test search with course name filtering"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
-            )
-
-            # Add test data
-            vector_store.add_course_metadata(sample_course)
-            vector_store.add_course_content(sample_course_chunks)
-
-            # Test search with existing course
-            results = vector_store.search("Python", course_name="Python Fundamentals")
+        # Test search with existing course
+        results = populated_vector_store.search(
+            "Python", course_name="Python Fundamentals"
+        )
 
-            # Should find results
-            assert not results.is_empty()
-            assert results.error is None
+        # Should find results
+        assert not results.is_empty()
+        assert results.error is None
 
-            # Test search with non-existent course
-            results = vector_store.search("Python", course_name="Nonexistent Course")
+        # Test search with non-existent course
+        results = populated_vector_store.search(
+            "Python", course_name="Nonexistent Course"
+        )
 
-            # Should return error about course not found
-            assert results.error is not None
-            assert "No course found matching" in results.error
+        # Should return error about course not found
+        assert results.error is not None
+        assert "No course found matching" in results.error
 
-    def test_search_with_lesson_filter(self, sample_course, sample_course_chunks):
+    def test_search_with_lesson_filter(self, populated_vector_store):
         """Test search with lesson number filtering"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
-            )
+        # Test search with specific lesson
+        results = populated_vector_store.search("Python", lesson_number=1)
 
-            # Add test data
-            vector_store.add_course_metadata(sample_course)
-            vector_store.add_course_content(sample_course_chunks)
+        # Should find results
+        assert not results.is_empty()
+        assert results.error is None
 
-            # Test search with specific lesson
-            results = vector_store.search("Python", lesson_number=1)
+        # All results should be from lesson 1
+        for metadata in results.metadata:
+            if metadata.get("lesson_number") is not None:
+                assert metadata["lesson_number"] == 1
 
-            # Should find results
-            assert not results.is_empty()
-            assert results.error is None
-
-            # All results should be from lesson 1
-            for metadata in results.metadata:
-                if metadata.get("lesson_number") is not None:
-                    assert metadata["lesson_number"] == 1
-
-    def test_empty_search_results(self, sample_course, sample_course_chunks):
+    def test_empty_search_results(self, populated_vector_store):
         """Test search that should return no results"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
-            )
+        # Search for something that shouldn't exist
+        results = populated_vector_store.search(
+            "quantum physics nuclear reactor engineering"
+        )
+
+        # Should return empty but not error
+        assert results.is_empty()
+        assert results.error is None
 
-            # Add test data
-            vector_store.add_course_metadata(sample_course)
-            vector_store.add_course_content(sample_course_chunks)
 
-            # Search for something that shouldn't exist
-            results = vector_store.search("quantum physics nuclear reactor engineering")
+# Query well past the model's 256-token window; longer text would only be
+# tokenized and then truncated away
+LARGE_QUERY = ("What is Python programming? " * 100)[:2000]
 
-            # Should return empty but not error
-            assert results.is_empty()
-            assert results.error is None
+# Acceptable error messages for the error-condition tests
+PATH_ERROR = re.compile(r"permission|path", re.IGNORECASE)
+MODEL_ERROR = re.compile(r"model|not found", re.IGNORECASE)
+SIZE_ERROR = re.compile(r"too large|limit", re.IGNORECASE)
 
 
 class TestVectorStoreErrorConditions:
     """Test error conditions that could cause 'query failed'"""
 
-    def test_search_on_empty_database(self):
+    @pytest.mark.slow
+    def test_search_on_empty_database(self, vector_store):
         """Test search behavior on empty database"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
-            )
-
-            # Search on empty database
-            results = vector_store.search("anything")
+        # Search on empty database
+        results = vector_store.search("anything")
 
-            # Should return empty results, not error
-            assert results.is_empty()
-            assert results.error is None
+        # Should return empty results, not error
+        assert results.is_empty()
+        assert results.error is None
 
     def test_invalid_chroma_path(self):
         """Test initialization with invalid ChromaDB path"""
         # Use a path that doesn't exist and can't be created
         invalid_path = "/root/invalid/path/that/cannot/be/created"
 
+        # If this succeeds, ChromaDB created the path automatically, which is
+        # fine; otherwise the failure must be about the path
         try:
-            vector_store = VectorStore(
+            VectorStore(
                 chroma_path=invalid_path,
-                embedding_model="all-MiniLM-L6-v2",
+                embedding_model="unused",
                 max_results=5,
+                embedding_function=FakeEmbedder(),
             )
-            # If this succeeds, ChromaDB might create the path automatically
-            # That's fine for the test
         except Exception as e:
-            # Expected if the path truly cannot be created
-            assert "permission" in str(e).lower() or "path" in str(e).lower()
+            assert PATH_ERROR.search(str(e)), e
 
-    def test_invalid_embedding_model(self):
+    @pytest.mark.slow
+    def test_invalid_embedding_model(self, tmp_path):
         """Test initialization with invalid embedding model"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # This might take a while to fail as it tries to download the model
-            try:
-                vector_store = VectorStore(
-                    chroma_path=temp_dir,
-                    embedding_model="nonexistent-model-that-should-not-exist",
-                    max_results=5,
-                )
-                # If this doesn't fail immediately, the model loading happens lazily
-                # Try to force model loading by doing a search
-                vector_store.search("test")
-
-            except Exception as e:
-                # Expected - invalid model should cause an error
-                assert "model" in str(e).lower() or "not found" in str(e).lower()
-
-    def test_corrupted_data_handling(self, sample_course):
-        """Test handling of corrupted data in the vector store"""
-        with tempfile.TemporaryDirectory() as temp_dir:
+        # This might take a while to fail as it tries to download the model
+        with pytest.raises(Exception, match=MODEL_ERROR):
             vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
+                chroma_path=str(tmp_path),
+                embedding_model="nonexistent-model-that-should-not-exist",
+                max_results=5,
             )
+            # If this doesn't fail immediately, the model loading happens lazily
+            # Try to force model loading by doing a search
+            vector_store.search("test")
 
-            # Add valid course first
-            vector_store.add_course_metadata(sample_course)
-
-            # Try to add invalid data directly to collection
-            try:
-                # This should be caught and handled gracefully
-                vector_store.course_catalog.add(
-                    documents=["test"],
-                    metadatas=[{"invalid": "metadata_structure"}],
-                    ids=["test_id"],
-                )
-
-                # Try to search - should still work
-                results = vector_store.search("Python")
-                # Should either work or return a clear error
-                assert isinstance(results, SearchResults)
-
-            except Exception as e:
-                # If it fails, it should be a clear, handleable error
-                assert isinstance(e, Exception)
-
-    @patch("vector_store.chromadb.PersistentClient")
-    def test_chromadb_connection_failure(self, mock_client):
+    def test_corrupted_data_handling(self, wiring_vector_store, monkeypatch):
+        """Test handling of corrupted data in the vector store"""
+        # Catalog returns an entry whose metadata lacks the "title" key
+        corrupted = {
+            "ids": [["bad"]],
+            "documents": [["bad"]],
+            "metadatas": [[{"invalid": "metadata_structure"}]],
+            "distances": [[0.5]],
+        }
+        monkeypatch.setattr(
+            wiring_vector_store.course_catalog, "query", lambda **kwargs: corrupted
+        )
+
+        # Course resolution should fail cleanly and be reported, not raise
+        results = wiring_vector_store.search("Python", course_name="Python Basics")
+        assert isinstance(results, SearchResults)
+        assert results.error == "No course found matching 'Python Basics'"
+
+    def test_chromadb_connection_failure(self):
         """Test handling when ChromaDB connection fails"""
-        # Mock ChromaDB to raise an exception
-        mock_client.side_effect = Exception("ChromaDB connection failed")
+
+        def refuse_connection(**kwargs):
+            raise Exception("ChromaDB connection failed")
 
         # This should raise an exception during initialization
-        with pytest.raises(Exception) as exc_info:
+        with pytest.raises(Exception, match="ChromaDB connection failed"):
             VectorStore(
                 chroma_path="test_path",
                 embedding_model="all-MiniLM-L6-v2",
                 max_results=5,
+                client_factory=refuse_connection,
             )
 
-        assert "ChromaDB connection failed" in str(exc_info.value)
-
-    def test_large_query_handling(self, sample_course, sample_course_chunks):
+    @pytest.mark.slow
+    def test_large_query_handling(
+        self, vector_store, sample_course, sample_course_chunks
+    ):
         """Test handling of very large queries"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            vector_store = VectorStore(
-                chroma_path=temp_dir, embedding_model="all-MiniLM-L6-v2", max_results=5
-            )
-
-            # Add test data
-            vector_store.add_course_metadata(sample_course)
-            vector_store.add_course_content(sample_course_chunks)
-
-            # Very large query
-            large_query = "What is Python programming? " * 1000
-
-            try:
-                results = vector_store.search(large_query)
-                # Should handle gracefully
-                assert isinstance(results, SearchResults)
-
-            except Exception as e:
-                # If it fails, should be a clear error
-                assert "too large" in str(e).lower() or "limit" in str(e).lower()
-
-
+        # Add test data
+        vector_store.add_course_metadata(sample_course)
+        vector_store.add_course_content(sample_course_chunks)
+
+        results = vector_store.search(LARGE_QUERY)
+
+        # Should handle gracefully; search reports failures in results.error
+        assert isinstance(results, SearchResults)
+        if results.error:
+            assert SIZE_ERROR.search(results.error), results.error
+
+
+REAL_CHROMA_PATH = "./chroma_db"
+
+# Search queries that might exist in course content
+REAL_PROBE_QUERIES = [
+    "introduction",
+    "lesson",
+    "course",
+    "python",
+    "programming",
+    "tutorial",
+    "example",
+]
+
+
+# Checked at collection, so a fresh checkout never opens (and creates) the DB
+requires_real_db = pytest.mark.skipif(
+    not os.path.isdir(REAL_CHROMA_PATH), reason="real ChromaDB not present"
+)
+
+
+@pytest.fixture(scope="module")
+def real_vector_store(shared_embedding_function):
+    """The app's on-disk ChromaDB, opened once for the real-data tests"""
+    return VectorStore(
+        chroma_path=REAL_CHROMA_PATH,
+        embedding_model="all-MiniLM-L6-v2",
+        max_results=5,
+        embedding_function=shared_embedding_function,
+    )
+
+
+class StoreCounts(NamedTuple):
+    catalog_count: int
+    content_count: int
+
+
+@pytest.fixture(scope="module")
+def real_store_counts(real_vector_store):
+    """Collection sizes of the real ChromaDB, counted once per module"""
+    return StoreCounts(
+        catalog_count=real_vector_store.course_catalog.count(),
+        content_count=real_vector_store.course_content.count(),
+    )
+
+
+def _batch_search(vector_store, queries):
+    """Search content for every query with one embedding pass and one query"""
+    embeddings = vector_store.embedding_function(list(queries))
+    try:
+        results = vector_store.course_content.query(
+            query_embeddings=embeddings, n_results=vector_store.max_results
+        )
+    except Exception as e:
+        return dict.fromkeys(queries, SearchResults.empty(f"Search error: {e}"))
+
+    return {
+        query: SearchResults(
+            documents=results["documents"][i],
+            metadata=results["metadatas"][i],
+            distances=results["distances"][i],
+        )
+        for i, query in enumerate(queries)
+    }
+
+
+@pytest.mark.integration
+@pytest.mark.xdist_group(name="real_chroma")
+@requires_real_db
 class TestRealVectorStoreData:
     """Test against the actual vector store data if it exists"""
 
-    def test_existing_chroma_db_connectivity(self):
+    def test_existing_chroma_db_connectivity(self, real_store_counts):
         """Test connectivity to the existing ChromaDB instance"""
-        # Use the actual ChromaDB path from config
-        chroma_path = "./chroma_db"
-
-        try:
-            vector_store = VectorStore(
-                chroma_path=chroma_path,
-                embedding_model="all-MiniLM-L6-v2",
-                max_results=5,
-            )
+        # Test basic connectivity
+        catalog_count, content_count = real_store_counts
 
-            # Test basic connectivity
-            catalog_count = vector_store.course_catalog.count()
-            content_count = vector_store.course_content.count()
+        logger.info("Catalog count: %s", catalog_count)
+        logger.info("Content count: %s", content_count)
 
-            print(f"Catalog count: {catalog_count}")
-            print(f"Content count: {content_count}")
+        # These should be accessible without error
+        assert catalog_count >= 0
+        assert content_count >= 0
 
-            # These should be accessible without error
-            assert catalog_count >= 0
-            assert content_count >= 0
-
-        except Exception as e:
-            pytest.fail(f"Failed to connect to existing ChromaDB: {e}")
-
-    def test_existing_data_availability(self):
+    def test_existing_data_availability(self, real_vector_store):
         """Test if there's actual course data in the existing vector store"""
-        chroma_path = "./chroma_db"
-
         try:
-            vector_store = VectorStore(
-                chroma_path=chroma_path,
-                embedding_model="all-MiniLM-L6-v2",
-                max_results=5,
-            )
-
             # Get course titles
-            course_titles = vector_store.get_existing_course_titles()
-            print(f"Existing courses: {course_titles}")
+            course_titles = real_vector_store.get_existing_course_titles()
+            logger.info("Existing courses: %s", course_titles)
 
             # Get course count
-            course_count = vector_store.get_course_count()
-            print(f"Course count: {course_count}")
+            course_count = real_vector_store.get_course_count()
+            logger.info("Course count: %s", course_count)
 
             if course_count > 0:
                 # Test search on existing data
-                results = vector_store.search("Python")
-                print(
-                    f"Search results for 'Python': {len(results.documents)} documents"
+                results = real_vector_store.search("Python")
+                logger.info(
+                    "Search results for 'Python': %s documents", len(results.documents)
                 )
-                print(f"Search error: {results.error}")
+                logger.info("Search error: %s", results.error)
 
                 if results.error:
                     pytest.fail(f"Search failed on existing data: {results.error}")
@@ -415,128 +427,116 @@ class TestRealVectorStoreData:
                 # Test course resolution
                 if course_titles:
                     first_course = course_titles[0]
-                    resolved = vector_store._resolve_course_name(first_course)
-                    print(f"Course resolution for '{first_course}': {resolved}")
+                    resolved = real_vector_store._resolve_course_name(first_course)
+                    logger.info(
+                        "Course resolution for '%s': %s", first_course, resolved
+                    )
                     assert resolved is not None
 
             else:
-                print("No existing course data found - this may be the problem!")
+                logger.info("No existing course data found - this may be the problem!")
 
         except Exception as e:
             pytest.fail(f"Failed to access existing data: {e}")
 
-    def test_search_real_course_content(self):
+    def test_search_real_course_content(self, real_vector_store, real_store_counts):
         """Test search against real course content if available"""
-        chroma_path = "./chroma_db"
-
         try:
-            vector_store = VectorStore(
-                chroma_path=chroma_path,
-                embedding_model="all-MiniLM-L6-v2",
-                max_results=5,
-            )
-
-            # Try various search queries that might exist in course content
-            test_queries = [
-                "introduction",
-                "lesson",
-                "course",
-                "python",
-                "programming",
-                "tutorial",
-                "example",
-            ]
-
             search_results = {}
 
-            for query in test_queries:
-                results = vector_store.search(query)
+            batched = _batch_search(real_vector_store, REAL_PROBE_QUERIES)
+            for query, results in batched.items():
                 search_results[query] = {
                     "doc_count": len(results.documents),
                     "has_error": results.error is not None,
                     "error": results.error,
                 }
-                print(
-                    f"Query '{query}': {len(results.documents)} docs, error: {results.error}"
-                )
+            logger.info("Probe query results: %s", search_results)
 
             # At least one query should return results if data exists
             total_results = sum(r["doc_count"] for r in search_results.values())
 
             if total_results == 0:
-                print(
-                    "WARNING: No search results for any test query - possible data issue!"
+                logger.warning(
+                    "No search results for any test query - possible data issue!"
                 )
 
                 # Check if there's any content at all
-                content_count = vector_store.course_content.count()
+                content_count = real_store_counts.content_count
                 if content_count == 0:
                     pytest.fail(
                         "No course content found in vector store - this is likely the cause of 'query failed' errors"
                     )
                 else:
-                    print(
-                        f"Content exists ({content_count} chunks) but no search results - possible embedding/search issue"
+                    logger.info(
+                        "Content exists (%s chunks) but no search results - possible embedding/search issue",
+                        content_count,
                     )
 
         except Exception as e:
             pytest.fail(f"Failed to search real course content: {e}")
 
+    @pytest.mark.parametrize("query", REAL_PROBE_QUERIES)
+    def test_real_query_searches_cleanly(self, real_vector_store, query):
+        """Each probe query goes through VectorStore.search without an error"""
+        results = real_vector_store.search(query)
 
+        assert results.error is None, f"Query '{query}' failed: {results.error}"
+
+
+@pytest.mark.integration
+@pytest.mark.xdist_group(name="real_chroma")
+@requires_real_db
 class TestDiagnosticUtilities:
     """Utility tests for diagnosing vector store issues"""
 
-    def test_vector_store_info_dump(self):
+    def test_vector_store_info_dump(self, real_vector_store, real_store_counts):
         """Dump comprehensive information about the vector store state"""
-        chroma_path = "./chroma_db"
-
         try:
-            vector_store = VectorStore(
-                chroma_path=chroma_path,
-                embedding_model="all-MiniLM-L6-v2",
-                max_results=5,
-            )
-
-            print("\n=== VECTOR STORE DIAGNOSTIC INFORMATION ===")
+            logger.info("=== VECTOR STORE DIAGNOSTIC INFORMATION ===")
 
             # Basic info
-            print(f"ChromaDB path: {chroma_path}")
-            print(f"Max results: {vector_store.max_results}")
+            logger.info("ChromaDB path: %s", REAL_CHROMA_PATH)
+            logger.info("Max results: %s", real_vector_store.max_results)
 
             # Collection info
-            catalog_count = vector_store.course_catalog.count()
-            content_count = vector_store.course_content.count()
-            print(f"Catalog collection count: {catalog_count}")
-            print(f"Content collection count: {content_count}")
+            catalog_count, content_count = real_store_counts
+            logger.info("Catalog collection count: %s", catalog_count)
+            logger.info("Content collection count: %s", content_count)
 
             # Course info
-            course_titles = vector_store.get_existing_course_titles()
-            print(f"Available courses: {course_titles}")
+            course_titles = real_vector_store.get_existing_course_titles()
+            logger.info("Available courses: %s", course_titles)
 
             # Metadata info
             if catalog_count > 0:
-                all_courses = vector_store.get_all_courses_metadata()
-                print(f"Course metadata count: {len(all_courses)}")
+                all_courses = real_vector_store.get_all_courses_metadata()
+                logger.info("Course metadata count: %s", len(all_courses))
                 for course in all_courses[:3]:  # Show first 3
-                    print(
-                        f"  - {course.get('title', 'Unknown')}: {len(course.get('lessons', []))} lessons"
+                    logger.info(
+                        "  - %s: %s lessons",
+                        course.get("title", "Unknown"),
+                        len(course.get("lessons", [])),
                     )
 
             # Content sample
             if content_count > 0:
-                content_sample = vector_store.course_content.get(limit=3)
-                print(f"Content sample (first 3 items):")
+                content_sample = real_vector_store.course_content.get(
+                    limit=3, include=["documents", "metadatas"]
+                )
+                logger.info("Content sample (first 3 items):")
                 for i, doc in enumerate(content_sample.get("documents", [])[:3]):
                     meta = content_sample.get("metadatas", [{}])[i]
-                    print(
-                        f"  - {doc[:100]}... (Course: {meta.get('course_title', 'Unknown')})"
+                    logger.info(
+                        "  - %s... (Course: %s)",
+                        doc[:100],
+                        meta.get("course_title", "Unknown"),
                     )
 
-            print("=== END DIAGNOSTIC INFORMATION ===\n")
+            logger.info("=== END DIAGNOSTIC INFORMATION ===")
 
             # This test always passes - it's for information gathering
             assert True
 
         except Exception as e:
-            print(f"Diagnostic failed: {e}")
             pytest.fail(f"Could not gather diagnostic information: {e}")
@@ -1,13 +1,14 @@
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import chromadb
+import numpy as np
 from chromadb.config import Settings
 from models import Course, CourseChunk
 from sentence_transformers import SentenceTransformer
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SearchResults:
     """Container for search results with metadata"""
 
@@ -40,23 +41,39 @@ class SearchResults:
         """Check if results are empty"""
         return len(self.documents) == 0
 
+    @property
+    def distance_array(self) -> np.ndarray:
+        """Distances as a float32 array for vectorized checks (min, argmin, ...)"""
+        return np.asarray(self.distances, dtype=np.float32)
+
 
 class VectorStore:
     """Vector storage using ChromaDB for course content and metadata"""
 
-    def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5):
+    def __init__(
+        self,
+        chroma_path: str,
+        embedding_model: str,
+        max_results: int = 5,
+        embedding_function: Optional[Any] = None,
+        client_factory: Optional[Callable[..., Any]] = None,
+    ):
         self.max_results = max_results
         # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(
+        client_factory = client_factory or chromadb.PersistentClient
+        self.client = client_factory(
             path=chroma_path, settings=Settings(anonymized_telemetry=False)
         )
 
-        # Set up sentence transformer embedding function
-        self.embedding_function = (
-            chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name=embedding_model
+        # Set up sentence transformer embedding function, unless one is given
+        # (e.g. a model already loaded for another store)
+        if embedding_function is None:
+            embedding_function = (
+                chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=embedding_model
+                )
             )
-        )
+        self.embedding_function = embedding_function
 
         # Create collections for different types of data
         self.course_catalog = self._create_collection(
@@ -78,6 +95,7 @@ class VectorStore:
         course_name: Optional[str] = None,
         lesson_number: Optional[int] = None,
         limit: Optional[int] = None,
+        query_embedding: Optional[Sequence[float]] = None,
     ) -> SearchResults:
         """
         Main search interface that handles course resolution and content search.
@@ -87,6 +105,7 @@ class VectorStore:
             course_name: Optional course name/title to filter by
             lesson_number: Optional lesson number to filter by
             limit: Maximum results to return
+            query_embedding: Precomputed embedding of query, skips re-embedding
 
         Returns:
             SearchResults object with documents and metadata
@@ -106,9 +125,16 @@ class VectorStore:
         search_limit = limit if limit is not None else self.max_results
 
         try:
-            results = self.course_content.query(
-                query_texts=[query], n_results=search_limit, where=filter_dict
-            )
+            if query_embedding is not None:
+                results = self.course_content.query(
+                    query_embeddings=[query_embedding],
+                    n_results=search_limit,
+                    where=filter_dict,
+                )
+            else:
+                results = self.course_content.query(
+                    query_texts=[query], n_results=search_limit, where=filter_dict
+                )
             return SearchResults.from_chroma(results)
         except Exception as e:
             return SearchResults.empty(f"Search error: {str(e)}")
@@ -291,3 +317,38 @@ class VectorStore:
             return None
         except Exception as e:
             print(f"Error getting lesson link: {e}")
+
+    def get_lesson_links(
+        self, pairs: List[Tuple[str, int]]
+    ) -> Dict[Tuple[str, int], Optional[str]]:
+        """Get lesson links for many (course title, lesson number) pairs at once"""
+        import json
+
+        links = {}
+        if not pairs:
+            return links
+
+        try:
+            # One catalog lookup for every course involved (title is the ID)
+            titles = list(dict.fromkeys(title for title, _ in pairs))
+            results = self.course_catalog.get(ids=titles)
+
+            lessons_by_course = {}
+            for title, metadata in zip(
+                results.get("ids") or [], results.get("metadatas") or []
+            ):
+                lessons_json = metadata.get("lessons_json") if metadata else None
+                lessons = json.loads(lessons_json) if lessons_json else []
+                lessons_by_course[title] = {
+                    lesson.get("lesson_number"): lesson.get("lesson_link")
+                    for lesson in lessons
+                }
+
+            for title, lesson_number in pairs:
+                links[(title, lesson_number)] = lessons_by_course.get(title, {}).get(
+                    lesson_number
+                )
+        except Exception as e:
+            print(f"Error getting lesson links: {e}")
+
+        return links
@@ -13,7 +13,7 @@ echo "🔍 Running linter..."
 
 echo ""
 echo "🧪 Running tests..."
-uv run pytest backend/tests/ -v
+uv run pytest backend/tests/ -v -n auto --dist loadgroup -m ""
 
 echo ""
 echo "✨ All quality checks complete!"
\ No newline at end of file